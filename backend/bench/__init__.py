@@ -0,0 +1,6 @@
+"""Офлайн-бенчмарки сервисов.
+
+Запуск из каталога backend: `python -m bench` (все сервисы, сводный JSON в
+bench/results/) или `python -m bench.<модуль>` (catalog, auth, serialization).
+Зависимости — bench/requirements.txt плюс requirements.txt сервисов.
+"""
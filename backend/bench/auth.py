@@ -0,0 +1,104 @@
+"""Бенчмарк auth-сервиса в процессе, без сети и без docker.
+
+    cd backend && python -m bench.auth --requests 500 --concurrency 16
+
+Redis подменяется на fakeredis, лимитер частоты выключен, SMTP не настроен (dev-режим: код только
+логируется, вывод сервиса подавляется). Сценарии:
+- /login/ — каждый запрос со своим email, чтобы не упираться в cooldown; письмо только
+  ставится в очередь, фоновый отправщик выключен (fakeredis не умеет блокирующий XREADGROUP);
+- /confirm/ — OTP заранее выдаются через `issue_otp`, запрос подтверждает верный код;
+- /refresh/ — refresh token в cookie.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+from pathlib import Path
+
+import httpx
+
+from bench.harness import Scenario, run_all, use_service, write_json
+
+
+async def issue_codes(count: int) -> list[tuple[str, str]]:
+    from app.core.otp_service import issue_otp
+
+    pairs = []
+    for i in range(count):
+        email = f"confirm{i}@example.com"
+        pairs.append((email, await issue_otp(email)))
+    return pairs
+
+
+def scenarios(codes: list[tuple[str, str]], refresh_token: str) -> list[Scenario]:
+    A = "/api/v1/auth"
+    return [
+        Scenario("POST /api/v1/auth/login/", lambda c, i: c.post(f"{A}/login/", json={"email": f"login{i}@example.com"})),
+        Scenario(
+            "POST /api/v1/auth/confirm/",
+            lambda c, i: c.post(f"{A}/confirm/", json={"email": codes[i][0], "code": codes[i][1]}),
+        ),
+        Scenario(
+            "POST /api/v1/auth/refresh/",
+            lambda c, i: c.post(f"{A}/refresh/", headers={"Cookie": f"refresh_token={refresh_token}"}),
+        ),
+    ]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import fakeredis
+
+    import app.core.redis_client as redis_client
+    from app.core.config import settings
+    from app.core.jwt import create_refresh_token
+
+    redis_client._redis = fakeredis.FakeAsyncRedis()
+    settings.email_worker_enabled = False
+    # все запросы идут с одного адреса — лимитер отклонил бы почти всё
+    settings.rate_limit_enabled = False
+
+    from app.main import app
+
+    codes = await issue_codes(args.requests)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://auth", timeout=None) as client:
+            # dev-режим печатает каждый OTP в stdout — прячем, чтобы не мешал отчёту
+            with contextlib.redirect_stdout(io.StringIO()):
+                routes = await run_all(
+                    client,
+                    scenarios(codes, create_refresh_token("bench@example.com")),
+                    openapi=app.openapi(),
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                )
+
+    return {
+        "service": "auth",
+        "config": {"requests": args.requests, "concurrency": args.concurrency},
+        "routes": routes,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Auth service benchmark")
+    parser.add_argument("--requests", type=int, default=300, help="запросов на маршрут")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--out", type=Path, default=None, help="куда записать JSON (по умолчанию stdout)")
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    use_service("auth")
+    result = asyncio.run(run(args))
+
+    if args.out:
+        write_json(args.out, result)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
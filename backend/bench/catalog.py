@@ -0,0 +1,287 @@
+"""Бенчмарк catalog-сервиса в процессе, без сети и без docker.
+
+    cd backend && python -m bench.catalog --products 10000 --requests 500 --concurrency 16
+
+БД — временный файл SQLite (aiosqlite) или любая локальная Postgres через
+`--database-url` (база должна быть пустой: таблицы создаёт startup сервиса).
+Redis подменяется на fakeredis. Перед прогоном сидится синтетический каталог
+заданного размера; затем по каждому маршруту /api/v1 выполняется `--requests`
+запросов в `--concurrency` потоков, и печатаются rps и p50/p95/p99.
+
+Карточки (GET /{id}) после первого запроса отдаются из read-through кэша —
+это и есть рабочий режим сервиса. Результат пишется в JSON (`--out`).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import sys
+import tempfile
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+from bench.harness import Scenario, run_all, use_service, write_json
+
+NOUNS = ["Футболка", "Худи", "Свитшот", "Джинсы", "Куртка", "Платье", "Рубашка", "Шорты", "Кепка", "Носки"]
+ADJECTIVES = ["базовая", "oversize", "хлопковая", "тёплая", "летняя", "классическая", "спортивная", "льняная"]
+COLORS = ["чёрный", "белый", "красный", "синий", "серый", "зелёный", "бежевый"]
+SEARCH_QUERIES = ["футболка", "худи чёрный", "красные футболки", "куртка тёплая", "джинсы", "футболк", "свитшот серый"]
+
+
+def _png(width: int = 64, height: int = 64) -> bytes:
+    """Минимальный PNG без Pillow: однотонный RGB."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    raw = b"".join(b"\x00" + b"\xd0\x30\x30" * width for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def _product_row(i: int, category_id: int, rnd: random.Random, sku_prefix: str = "SKU") -> dict:
+    return {
+        "category_id": category_id,
+        "name": f"{rnd.choice(NOUNS)} {rnd.choice(ADJECTIVES)} {rnd.choice(COLORS)}",
+        "description": None if i % 3 == 0 else f"Синтетический товар №{i}, {rnd.choice(COLORS)} цвет",
+        "sku": f"{sku_prefix}-{i:08d}",
+        "price": round(rnd.uniform(300, 15000), 2),
+        "is_active": i % 7 != 0,
+    }
+
+
+async def seed(args: argparse.Namespace) -> dict[str, list[int]]:
+    """Наполняет БД и возвращает id сущностей для сценариев."""
+    from sqlalchemy import insert
+
+    from app.db.session import SessionLocal
+    from app.models.brand import Brand
+    from app.models.category import Category
+    from app.models.product import Product
+    from app.models.user import User
+
+    rnd = random.Random(args.seed)
+    extra = args.requests  # столько строк удаляют DELETE-сценарии
+
+    async def insert_ids(session, model, rows: list[dict]) -> list[int]:
+        ids: list[int] = []
+        for start in range(0, len(rows), 1000):
+            res = await session.execute(insert(model).returning(model.id), rows[start:start + 1000])
+            ids.extend(res.scalars().all())
+        return ids
+
+    async with SessionLocal() as session:
+        roots = max(1, args.categories // 5)
+        root_ids = await insert_ids(
+            session,
+            Category,
+            [{"name": f"Раздел {i}", "slug": f"section-{i}", "is_active": True} for i in range(roots)],
+        )
+        child_ids = await insert_ids(
+            session,
+            Category,
+            [
+                {"name": f"Категория {i}", "slug": f"category-{i}", "is_active": True, "parent_id": root_ids[i % roots]}
+                for i in range(args.categories - roots)
+            ],
+        )
+        category_ids = root_ids + child_ids
+        # листовые категории без товаров — для DELETE
+        spare_category_ids = await insert_ids(
+            session,
+            Category,
+            [{"name": f"Пустая {i}", "slug": f"empty-{i}", "is_active": True} for i in range(extra)],
+        )
+
+        leaf_ids = child_ids or root_ids
+        product_ids = await insert_ids(
+            session,
+            Product,
+            [_product_row(i, leaf_ids[i % len(leaf_ids)], rnd) for i in range(args.products)],
+        )
+        spare_product_ids = await insert_ids(
+            session,
+            Product,
+            [_product_row(i, leaf_ids[i % len(leaf_ids)], rnd, "SPARE") for i in range(extra)],
+        )
+
+        brand_rows = [
+            {"name": f"Brand {i}", "slug": f"brand-{i}", "is_active": True, "description": f"Бренд №{i}"}
+            for i in range(args.brands + extra)
+        ]
+        brand_ids = await insert_ids(session, Brand, brand_rows)
+
+        user_rows = [
+            {"name": f"Пользователь {i}", "email": f"user{i}@example.com", "role": "admin", "is_active": True}
+            for i in range(args.users + extra)
+        ]
+        user_ids = await insert_ids(session, User, user_rows)
+        await session.commit()
+
+    return {
+        "categories": category_ids,
+        "leaf_categories": leaf_ids,
+        "spare_categories": spare_category_ids,
+        "products": product_ids,
+        "spare_products": spare_product_ids,
+        "brands": brand_ids[: args.brands],
+        "spare_brands": brand_ids[args.brands:],
+        "users": user_ids[: args.users],
+        "spare_users": user_ids[args.users:],
+    }
+
+
+def scenarios(ids: dict[str, list[int]], headers: dict[str, str]) -> list[Scenario]:
+    H = headers
+    png = _png()
+
+    def pick(kind: str, i: int) -> int:
+        values = ids[kind]
+        return values[i % len(values)]
+
+    def bulk_body(i: int) -> bytes:
+        rnd = random.Random(i)
+        lines = [
+            json.dumps(_product_row(i * 20 + j, pick("leaf_categories", i + j), rnd, "BULK"), ensure_ascii=False)
+            for j in range(20)
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    P, C, B, U = "/api/v1/products", "/api/v1/categories", "/api/v1/brands", "/api/v1/users"
+    sorts = ["id", "name", "price"]
+
+    return [
+        # товары
+        Scenario("GET /api/v1/products/", lambda c, i: c.get(f"{P}/", params={"sort": sorts[i % 3], "limit": 50}, headers=H)),
+        Scenario(
+            "GET /api/v1/products/search",
+            lambda c, i: c.get(f"{P}/search", params={"q": SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}, headers=H),
+        ),
+        Scenario(
+            "GET /api/v1/products/facets",
+            lambda c, i: c.get(f"{P}/facets", params={} if i % 4 == 0 else {"category_id": pick("categories", i), "include_descendants": "true"}, headers=H),
+        ),
+        Scenario("GET /api/v1/products/export", lambda c, i: c.get(f"{P}/export", params={"format": "ndjson"}, headers=H), requests=10),
+        Scenario("GET /api/v1/products/{product_id}", lambda c, i: c.get(f"{P}/{pick('products', i)}", headers=H)),
+        Scenario(
+            "POST /api/v1/products/",
+            lambda c, i: c.post(f"{P}/", json={**_product_row(i, pick("leaf_categories", i), random.Random(i), "NEW")}, headers=H),
+            expect=(201,),
+        ),
+        Scenario(
+            "POST /api/v1/products/bulk",
+            lambda c, i: c.post(f"{P}/bulk", content=bulk_body(i), headers={**H, "Content-Type": "application/x-ndjson"}),
+        ),
+        Scenario("PATCH /api/v1/products/{product_id}", lambda c, i: c.patch(f"{P}/{pick('products', i)}", json={"price": 100 + i % 900}, headers=H)),
+        Scenario("DELETE /api/v1/products/{product_id}", lambda c, i: c.delete(f"{P}/{ids['spare_products'][i]}", headers=H), expect=(204,)),
+        # категории
+        Scenario("GET /api/v1/categories/", lambda c, i: c.get(f"{C}/", params={"limit": 100}, headers=H)),
+        Scenario("GET /api/v1/categories/tree", lambda c, i: c.get(f"{C}/tree", headers=H)),
+        Scenario("GET /api/v1/categories/{category_id}", lambda c, i: c.get(f"{C}/{pick('categories', i)}", headers=H)),
+        Scenario("POST /api/v1/categories/", lambda c, i: c.post(f"{C}/", json={"name": f"Новая {i}", "slug": f"new-{i}"}, headers=H), expect=(201,)),
+        Scenario("PATCH /api/v1/categories/{category_id}", lambda c, i: c.patch(f"{C}/{pick('categories', i)}", json={"is_active": i % 2 == 0}, headers=H)),
+        Scenario("DELETE /api/v1/categories/{category_id}", lambda c, i: c.delete(f"{C}/{ids['spare_categories'][i]}", headers=H), expect=(204,)),
+        # бренды
+        Scenario("GET /api/v1/brands/", lambda c, i: c.get(f"{B}/", headers=H)),
+        Scenario("GET /api/v1/brands/{brand_id}", lambda c, i: c.get(f"{B}/{pick('brands', i)}", headers=H)),
+        Scenario("POST /api/v1/brands/", lambda c, i: c.post(f"{B}/", json={"name": f"New Brand {i}"}, headers=H), expect=(201,)),
+        Scenario("PATCH /api/v1/brands/{brand_id}", lambda c, i: c.patch(f"{B}/{pick('brands', i)}", json={"description": f"Описание {i}"}, headers=H)),
+        Scenario(
+            "POST /api/v1/brands/{brand_id}/image",
+            lambda c, i: c.post(f"{B}/{pick('brands', i)}/image", files={"file": ("logo.png", png, "image/png")}, headers=H),
+        ),
+        Scenario("DELETE /api/v1/brands/{brand_id}", lambda c, i: c.delete(f"{B}/{ids['spare_brands'][i]}", headers=H), expect=(204,)),
+        # пользователи
+        Scenario("GET /api/v1/users/", lambda c, i: c.get(f"{U}/", headers=H)),
+        Scenario("GET /api/v1/users/{user_id}", lambda c, i: c.get(f"{U}/{pick('users', i)}", headers=H)),
+        Scenario("POST /api/v1/users/", lambda c, i: c.post(f"{U}/", json={"name": f"Новый {i}", "email": f"new{i}@example.com"}, headers=H), expect=(201,)),
+        Scenario("PATCH /api/v1/users/{user_id}", lambda c, i: c.patch(f"{U}/{pick('users', i)}", json={"is_active": i % 2 == 0}, headers=H)),
+        Scenario("DELETE /api/v1/users/{user_id}", lambda c, i: c.delete(f"{U}/{ids['spare_users'][i]}", headers=H), expect=(204,)),
+    ]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import fakeredis
+    from jose import jwt
+
+    import app.core.redis_client as redis_client
+    from app.core.config import settings
+
+    redis_client._redis = fakeredis.FakeAsyncRedis()
+
+    from app.main import app
+
+    token = jwt.encode(
+        {"sub": "bench@example.com", "type": "access", "exp": datetime.now(timezone.utc) + timedelta(hours=1)},
+        settings.jwt_secret,
+        algorithm=settings.jwt_algorithm,
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with app.router.lifespan_context(app):
+        ids = await seed(args)
+        print(
+            f"catalog: seeded {len(ids['products'])} products, {len(ids['categories'])} categories, "
+            f"{len(ids['brands'])} brands, {len(ids['users'])} users",
+            file=sys.stderr,
+        )
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://catalog", timeout=None) as client:
+            routes = await run_all(
+                client,
+                scenarios(ids, headers),
+                openapi=app.openapi(),
+                requests=args.requests,
+                concurrency=args.concurrency,
+            )
+
+    return {
+        "service": "catalog",
+        "config": {
+            "database": "postgresql" if args.database_url else "sqlite",
+            "products": args.products,
+            "categories": args.categories,
+            "brands": args.brands,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "routes": routes,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Catalog service benchmark")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--brands", type=int, default=200)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=300, help="запросов на маршрут")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default=None, help="пустая локальная Postgres вместо SQLite")
+    parser.add_argument("--out", type=Path, default=None, help="куда записать JSON (по умолчанию stdout)")
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-catalog-") as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{tmp}/catalog.db"
+        os.environ["MEDIA_ROOT"] = os.path.join(tmp, "media")
+        use_service("catalog")
+        result = asyncio.run(run(args))
+
+    if args.out:
+        write_json(args.out, result)
+    else:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Общая часть бенчмарков: прогон сценариев, перцентили, JSON-отчёты.
+
+Модуль не импортирует код сервисов — у catalog и auth один и тот же пакет `app`,
+поэтому каждый сервис гоняется в своём процессе (см. `bench.__main__`).
+"""
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+SERVICES_DIR = BACKEND_DIR / "services"
+RESULTS_DIR = BENCH_DIR / "results"
+
+API_PREFIX = "/api/v1"
+
+RequestFn = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    # "METHOD /шаблон/маршрута" — как в OpenAPI, по нему проверяется покрытие
+    name: str
+    request: RequestFn
+    # ожидаемые статусы; остальные считаются ошибками
+    expect: tuple[int, ...] = (200,)
+    # своё число запросов (например, для тяжёлого экспорта); None — общее
+    requests: int | None = None
+
+
+def use_service(name: str) -> None:
+    """Делает пакет `app` нужного сервиса импортируемым."""
+    sys.path.insert(0, str(SERVICES_DIR / name))
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль по методу nearest-rank; `sorted_values` отсортирован."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], elapsed: float, statuses: Counter, expect: tuple[int, ...]) -> dict:
+    values = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status not in expect)
+    ms = lambda v: round(v * 1000, 3)  # noqa: E731
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, *, requests: int, concurrency: int) -> dict:
+    """`concurrency` воркеров разбирают номера запросов 0..requests-1 из общего счётчика."""
+    total = scenario.requests or requests
+    counter = itertools.count()
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def worker() -> None:
+        while (i := next(counter)) < total:
+            started = time.perf_counter()
+            response = await scenario.request(client, i)
+            await response.aread()
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    return summarize(latencies, time.perf_counter() - started, statuses, scenario.expect)
+
+
+def api_routes(openapi: dict, prefix: str = API_PREFIX) -> set[str]:
+    return {
+        f"{method.upper()} {path}"
+        for path, operations in openapi["paths"].items()
+        if path.startswith(prefix)
+        for method in operations
+    }
+
+
+async def run_all(
+    client: httpx.AsyncClient,
+    scenarios: list[Scenario],
+    *,
+    openapi: dict,
+    requests: int,
+    concurrency: int,
+) -> dict[str, dict]:
+    missing = sorted(api_routes(openapi) - {s.name for s in scenarios})
+    for name in missing:
+        print(f"warning: no scenario for {name}", file=sys.stderr)
+
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = await run_scenario(client, scenario, requests=requests, concurrency=concurrency)
+        stats = results[scenario.name]
+        print(
+            f"  {scenario.name:45s} {stats['rps']:9.1f} rps  p50 {stats['p50_ms']:8.2f}  "
+            f"p95 {stats['p95_ms']:8.2f}  p99 {stats['p99_ms']:8.2f} ms  errors {stats['errors']}",
+            file=sys.stderr,
+        )
+    return results
+
+
+def git_revision() -> dict:
+    def git(*args: str) -> str | None:
+        try:
+            out = subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return out.stdout.strip()
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--", "services")),
+    }
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    """Строки с изменением p95 и rps по маршрутам, которые есть в обоих отчётах."""
+    lines = []
+    for service, data in new["services"].items():
+        old_routes = old.get("services", {}).get(service, {}).get("routes", {})
+        for name, stats in data["routes"].items():
+            before = old_routes.get(name)
+            if not before:
+                continue
+            p95 = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            rps = (stats["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0.0
+            lines.append(
+                f"{service:8s} {name:45s} p95 {before['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f} ms ({p95:+6.1f}%)  "
+                f"rps {before['rps']:9.1f} -> {stats['rps']:9.1f} ({rps:+6.1f}%)"
+            )
+    return lines
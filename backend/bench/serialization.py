@@ -0,0 +1,116 @@
+"""Сравнение обычного и быстрого (FAST_JSON_ENABLED) пути сериализации списка товаров.
+
+    cd backend && python -m bench.serialization --rows 10000 --repeat 5
+
+БД — временный файл SQLite (aiosqlite), данные синтетические. Обычный путь —
+ORM-выборка + `fastapi.routing.serialize_response` с response_field реального
+маршрута GET /api/v1/products/ (то же, что делает FastAPI). Быстрый — select по
+колонкам + `FastRows.page_response`. Для каждого пути печатается медиана времени
+на всю страницу и пропускная способность в строках в секунду.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CATALOG_DIR = Path(__file__).resolve().parent.parent / "services" / "catalog"
+
+
+def _setup_env(db_path: str) -> None:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ.setdefault("MEDIA_ROOT", tempfile.mkdtemp(prefix="bench-media-"))
+    sys.path.insert(0, str(CATALOG_DIR))
+
+
+async def _seed(rows: int) -> None:
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    from app.models.category import Category
+    from app.models.product import Product
+    import app.models  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as session:
+        session.add(Category(id=1, name="Bench", slug="bench"))
+        await session.flush()
+        await session.execute(
+            Product.__table__.insert(),
+            [
+                {
+                    "category_id": 1,
+                    "name": f"Товар {i}",
+                    "description": None if i % 3 else f"Описание товара {i}",
+                    "sku": f"BENCH-{i:07d}",
+                    "price": round(100 + (i * 7.31) % 9000, 2),
+                    "is_active": i % 5 != 0,
+                }
+                for i in range(rows)
+            ],
+        )
+        await session.commit()
+
+
+async def _measure(rows: int, repeat: int) -> dict[str, list[float]]:
+    from fastapi.routing import serialize_response
+    from sqlalchemy import select
+
+    from app.api.v1.products import PRODUCT_ROWS, router
+    from app.core.pagination import PageParams, paginate
+    from app.db.session import SessionLocal
+    from app.models.product import Product
+
+    route = next(r for r in router.routes if r.path == "/" and "GET" in r.methods)
+    params = PageParams(cursor=None, limit=rows)
+    order_by = (Product.id,)
+
+    async def default_path() -> bytes:
+        async with SessionLocal() as session:
+            page = await paginate(session, select(Product), params, order_by=order_by)
+            return await serialize_response(field=route.response_field, response_content=page, dump_json=True)
+
+    async def fast_path() -> bytes:
+        async with SessionLocal() as session:
+            page = await paginate(session, PRODUCT_ROWS.select(), params, order_by=order_by, scalars=False)
+            return PRODUCT_ROWS.page_response(page).body
+
+    # оба пути должны отдавать одинаковый JSON
+    assert await default_path() == await fast_path(), "fast path output differs"
+
+    timings: dict[str, list[float]] = {"default": [], "fast": []}
+    for _ in range(repeat):
+        for name, fn in (("default", default_path), ("fast", fast_path)):
+            started = time.perf_counter()
+            await fn()
+            timings[name].append(time.perf_counter() - started)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        _setup_env(os.path.join(tmp, "catalog.db"))
+
+        async def run() -> dict[str, list[float]]:
+            await _seed(args.rows)
+            return await _measure(args.rows, args.repeat)
+
+        timings = asyncio.run(run())
+
+    medians = {name: statistics.median(values) for name, values in timings.items()}
+    for name, median in medians.items():
+        print(f"{name:8s} {median * 1000:9.1f} ms / {args.rows} rows   {args.rows / median:12,.0f} rows/s")
+    print(f"speedup  {medians['default'] / medians['fast']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, Response, Cookie
+from fastapi import APIRouter, Depends, HTTPException, Response, Cookie
 from jose import jwt, JWTError
 
 from app.core.jwt import create_access_token, create_refresh_token
 from app.core.config import settings
 from app.core.email_sender import send_otp_email, EmailSendError
+from app.core.email_outbox import enqueue_otp_email
+from app.core.rate_limit import RateLimit
 from app.core.otp_service import (
     issue_otp,
     verify_otp,
@@ -17,12 +19,17 @@ router = APIRouter()
 
 SECURITY = [{"BearerAuth": []}]
 
+login_limit = RateLimit("login", settings.rate_limit_login)
+confirm_limit = RateLimit("confirm", settings.rate_limit_confirm)
+refresh_limit = RateLimit("refresh", settings.rate_limit_refresh)
+
 
 @router.post(
     "/login/",
+    dependencies=[Depends(login_limit)],
     summary="Запросить OTP-код",
     description=(
-        "Генерирует одноразовый OTP-код и отправляет его на email.\n\n"
+        "Генерирует одноразовый OTP-код и ставит письмо с ним в очередь отправки.\n\n"
         "Ограничения:\n"
         "- нельзя запрашивать слишком часто (cooldown)\n"
         "- код действует ограниченное время\n\n"
@@ -30,8 +37,8 @@ SECURITY = [{"BearerAuth": []}]
     ),
     openapi_extra={
         "responses": {
-            429: {"description": "Слишком частые запросы. Подождите и попробуйте снова."},
-            500: {"description": "Ошибка отправки письма (SMTP)"},
+            429: {"description": "Слишком частые запросы. Подождите и попробуйте снова (см. `Retry-After`)."},
+            500: {"description": "Ошибка отправки письма (SMTP), если очередь писем выключена"},
         }
     },
 )
@@ -41,6 +48,11 @@ async def login(data: LoginIn):
     except OtpRateLimitError:
         raise HTTPException(status_code=429, detail="Too many requests. Try later.")
 
+    if settings.email_outbox_enabled:
+        # письмо отправит фоновый воркер (app.core.email_outbox)
+        await enqueue_otp_email(data.email, code)
+        return {"ok": True, "queued": True}
+
     try:
         sent = await send_otp_email(data.email, code)
     except EmailSendError:
@@ -52,6 +64,7 @@ async def login(data: LoginIn):
 @router.post(
     "/confirm/",
     response_model=TokenOut,
+    dependencies=[Depends(confirm_limit)],
     summary="Подтвердить OTP-код",
     description=(
         "Проверяет OTP-код. Если код верный:\n"
@@ -62,7 +75,7 @@ async def login(data: LoginIn):
     openapi_extra={
         "responses": {
             400: {"description": "Неверный код или код истёк"},
-            429: {"description": "Слишком много попыток ввода кода"},
+            429: {"description": "Слишком много попыток ввода кода или запросов (см. `Retry-After`)"},
         }
     },
 )
@@ -94,6 +107,7 @@ async def confirm(data: ConfirmIn, response: Response):
 @router.post(
     "/refresh/",
     response_model=TokenOut,
+    dependencies=[Depends(refresh_limit)],
     summary="Обновить access token",
     description=(
         "Возвращает новый `access_token` по `refresh_token`, который хранится в httpOnly cookie.\n\n"
@@ -102,6 +116,7 @@ async def confirm(data: ConfirmIn, response: Response):
     openapi_extra={
         "responses": {
             401: {"description": "Нет refresh token cookie или refresh token невалиден"},
+            429: {"description": "Слишком частые запросы (см. `Retry-After`)"},
         }
     },
 )
@@ -9,11 +9,39 @@ class Settings(BaseModel):
     access_token_ttl: int = int(os.getenv("ACCESS_TOKEN_TTL", "900"))  # 15 минут
     refresh_token_ttl: int = int(os.getenv("REFRESH_TOKEN_TTL", str(60 * 60 * 24 * 7)))  # 7 дней
 
+    # Redis (OTP, cooldown, счётчики попыток)
+    redis_url: str = os.getenv("REDIS_URL") or "redis://{}:{}/0".format(
+        os.getenv("REDIS_HOST", "redis"), os.getenv("REDIS_PORT", "6379")
+    )
+    # потолок соединений на воркер; при исчерпании запрос ждёт свободное до redis_pool_timeout
+    redis_max_connections: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    redis_pool_timeout: float = float(os.getenv("REDIS_POOL_TIMEOUT", "2"))
+    # сколько соединений открыть заранее при старте
+    redis_prewarm_connections: int = int(os.getenv("REDIS_PREWARM_CONNECTIONS", "5"))
+    redis_socket_timeout: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1"))
+    redis_connect_timeout: float = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1"))
+    redis_health_check_interval: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+    # повторы при ConnectionError/TimeoutError: экспоненциальная задержка от base до cap секунд
+    redis_retries: int = int(os.getenv("REDIS_RETRIES", "3"))
+    redis_retry_backoff_base: float = float(os.getenv("REDIS_RETRY_BACKOFF_BASE", "0.05"))
+    redis_retry_backoff_cap: float = float(os.getenv("REDIS_RETRY_BACKOFF_CAP", "0.5"))
+
     # OTP
     otp_ttl_seconds: int = int(os.getenv("OTP_TTL_SECONDS", "300"))  # 5 минут
     otp_send_cooldown_seconds: int = int(os.getenv("OTP_SEND_COOLDOWN_SECONDS", "30"))  # 30 сек
     otp_confirm_max_attempts: int = int(os.getenv("OTP_CONFIRM_MAX_ATTEMPTS", "5"))  # 5 попыток
 
+    # Ограничение частоты (app.core.rate_limit): правила "scope:limit/window_seconds" через запятую
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    rate_limit_login: str = os.getenv("RATE_LIMIT_LOGIN", "ip:20/60,subnet:100/60,email:5/600")
+    rate_limit_confirm: str = os.getenv("RATE_LIMIT_CONFIRM", "ip:30/60,subnet:150/60,email:10/600")
+    rate_limit_refresh: str = os.getenv("RATE_LIMIT_REFRESH", "ip:60/60,subnet:300/60")
+    # сколько доверенных прокси стоит перед сервисом: IP клиента — N-й справа в X-Forwarded-For;
+    # 0 — заголовок игнорируется, берём адрес соединения
+    rate_limit_trusted_proxy_hops: int = int(os.getenv("RATE_LIMIT_TRUSTED_PROXY_HOPS", "0"))
+    # сколько локальных token bucket держать в памяти воркера
+    rate_limit_local_max_entries: int = int(os.getenv("RATE_LIMIT_LOCAL_MAX_ENTRIES", "10000"))
+
     # SMTP (если не задано — dev режим: логируем код)
     smtp_host: str | None = os.getenv("SMTP_HOST")
     smtp_port: int = int(os.getenv("SMTP_PORT", "587"))
@@ -21,6 +49,27 @@ class Settings(BaseModel):
     smtp_password: str | None = os.getenv("SMTP_PASSWORD")
     smtp_from: str = os.getenv("SMTP_FROM", "no-reply@example.com")
     smtp_tls: bool = os.getenv("SMTP_TLS", "true").lower() == "true"
+    smtp_timeout: float = float(os.getenv("SMTP_TIMEOUT", "10"))
+    # пул долгоживущих сессий (STARTTLS + AUTH один раз на соединение)
+    smtp_pool_size: int = int(os.getenv("SMTP_POOL_SIZE", "5"))
+    # простаивавшую дольше N секунд сессию перед отправкой проверяем NOOP
+    smtp_keepalive_seconds: float = float(os.getenv("SMTP_KEEPALIVE_SECONDS", "30"))
+    smtp_max_messages_per_connection: int = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+
+    # Очередь писем (Redis Stream): /login/ не ждёт SMTP; false — отправка прямо в запросе
+    email_outbox_enabled: bool = os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+    # фоновый отправщик в процессе API; при false нужен отдельный `python -m app.workers.email`
+    email_worker_enabled: bool = os.getenv("EMAIL_WORKER_ENABLED", "true").lower() == "true"
+    email_worker_concurrency: int = int(os.getenv("EMAIL_WORKER_CONCURRENCY", "10"))
+    email_worker_block_ms: int = int(os.getenv("EMAIL_WORKER_BLOCK_MS", "1000"))
+    email_worker_shutdown_timeout: float = float(os.getenv("EMAIL_WORKER_SHUTDOWN_TIMEOUT", "10"))
+    # повторы с экспоненциальной задержкой, затем — dead-letter стрим
+    email_max_attempts: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+    email_retry_base_seconds: float = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "2"))
+    email_retry_max_seconds: float = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "60"))
+    # сообщения упавшего воркера забираются, если висят без ACK дольше N секунд
+    email_claim_idle_seconds: float = float(os.getenv("EMAIL_CLAIM_IDLE_SECONDS", "60"))
+    email_outbox_maxlen: int = int(os.getenv("EMAIL_OUTBOX_MAXLEN", "100000"))
 
 
 settings = Settings()
@@ -0,0 +1,196 @@
+"""Очередь исходящих писем (outbox) на Redis Stream.
+
+`/login/` только кладёт письмо в стрим (`XADD`, один round trip) и сразу
+отвечает; SMTP-сессию ведёт фоновый воркер:
+
+- читает стрим через consumer group (`XREADGROUP`), поэтому несколько воркеров
+  (процессов uvicorn) делят поток писем, а неподтверждённые сообщения не теряются;
+- одновременно отправляет не больше `EMAIL_WORKER_CONCURRENCY` писем;
+- при ошибке откладывает письмо в sorted set повторов с экспоненциальной
+  задержкой; после `EMAIL_MAX_ATTEMPTS` попыток — в dead-letter стрим
+  (без кода: к этому моменту он всё равно истёк);
+- сообщения, зависшие у упавшего воркера дольше `EMAIL_CLAIM_IDLE_SECONDS`,
+  забирает себе (`XAUTOCLAIM`).
+
+Воркер запускается в процессе API (EMAIL_WORKER_ENABLED=true) или отдельно:
+`python -m app.workers.email`.
+
+Для локальной проверки подойдёт любой SMTP-сервер без TLS, например
+`python -m aiosmtpd -n -l localhost:1025` и `SMTP_HOST=localhost SMTP_PORT=1025 SMTP_TLS=false`.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+from prometheus_client import Counter
+from redis.exceptions import RedisError, ResponseError
+
+from app.core.config import settings
+from app.core.email_sender import send_otp_email
+from app.core.metrics import registry
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM = "email:outbox"
+GROUP = "email-senders"
+RETRY_KEY = "email:outbox:retry"
+DEAD_STREAM = "email:outbox:dead"
+
+EMAILS = Counter("email_outbox_messages_total", "Outbox messages by outcome.", ("outcome",), registry=registry)
+
+
+async def enqueue_otp_email(to_email: str, code: str) -> str:
+    """Ставит письмо с кодом в очередь и возвращает id сообщения в стриме."""
+    message_id = await get_redis().xadd(
+        STREAM,
+        {"to": to_email, "code": code, "attempt": "0", "queued_at": f"{time.time():.3f}"},
+        maxlen=settings.email_outbox_maxlen,
+        approximate=True,
+    )
+    EMAILS.labels("queued").inc()
+    return message_id.decode() if isinstance(message_id, bytes) else message_id
+
+
+def _decode(fields: dict) -> dict[str, str]:
+    return {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in fields.items()
+    }
+
+
+class EmailOutboxWorker:
+    def __init__(self):
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._semaphore = asyncio.Semaphore(settings.email_worker_concurrency)
+        self._sending: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        self._last_claim = 0.0
+
+    async def start(self) -> None:
+        try:
+            await get_redis().xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._task = asyncio.create_task(self._run(), name="email-outbox")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # письма, которые уже отправляются, дописываем; остальные останутся в стриме
+        if self._sending:
+            await asyncio.wait(self._sending, timeout=settings.email_worker_shutdown_timeout)
+        # не успевшие за таймаут отменяем до закрытия пулов Redis и SMTP: без ACK
+        # сообщение остаётся в pending и его заберёт другой воркер (XAUTOCLAIM)
+        stragglers = list(self._sending)
+        for task in stragglers:
+            task.cancel()
+        await asyncio.gather(*stragglers, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._requeue_due_retries()
+                await self._claim_stale()
+                await self._read_batch()
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                logger.warning("email outbox: redis error: %s", e)
+                await asyncio.sleep(1)
+
+    async def _read_batch(self) -> None:
+        # не берём из стрима больше, чем можем сразу начать отправлять
+        free = settings.email_worker_concurrency - len(self._sending)
+        if free <= 0:
+            await asyncio.wait(self._sending, return_when=asyncio.FIRST_COMPLETED)
+            return
+
+        response = await get_redis().xreadgroup(
+            GROUP,
+            self.consumer,
+            {STREAM: ">"},
+            count=free,
+            block=settings.email_worker_block_ms,
+        )
+        for _, messages in response or []:
+            for message_id, fields in messages:
+                self._spawn(message_id, _decode(fields))
+
+    async def _claim_stale(self) -> None:
+        now = time.monotonic()
+        if now - self._last_claim < settings.email_claim_idle_seconds:
+            return
+        self._last_claim = now
+
+        _, messages, *_ = await get_redis().xautoclaim(
+            STREAM,
+            GROUP,
+            self.consumer,
+            min_idle_time=int(settings.email_claim_idle_seconds * 1000),
+            start_id="0-0",
+            count=settings.email_worker_concurrency,
+        )
+        for message_id, fields in messages:
+            if fields:
+                self._spawn(message_id, _decode(fields))
+
+    async def _requeue_due_retries(self) -> None:
+        r = get_redis()
+        due = await r.zrangebyscore(RETRY_KEY, 0, time.time(), start=0, num=100)
+        for payload in due:
+            # ZREM вернёт 1 только одному из воркеров — письмо не задвоится
+            if await r.zrem(RETRY_KEY, payload):
+                await r.xadd(STREAM, json.loads(payload), maxlen=settings.email_outbox_maxlen, approximate=True)
+
+    def _spawn(self, message_id, fields: dict[str, str]) -> None:
+        task = asyncio.create_task(self._deliver(message_id, fields))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _deliver(self, message_id, fields: dict[str, str]) -> None:
+        r = get_redis()
+        attempt = int(fields.get("attempt", "0")) + 1
+        async with self._semaphore:
+            try:
+                await send_otp_email(fields["to"], fields["code"])
+            except Exception as e:
+                await self._fail(fields, attempt, e)
+            else:
+                EMAILS.labels("sent").inc()
+
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.xack(STREAM, GROUP, message_id)
+            pipe.xdel(STREAM, message_id)
+            await pipe.execute()
+
+    async def _fail(self, fields: dict[str, str], attempt: int, error: Exception) -> None:
+        r = get_redis()
+        if attempt >= settings.email_max_attempts:
+            EMAILS.labels("dead").inc()
+            logger.error("email to %s dead-lettered after %d attempts: %s", fields["to"], attempt, error)
+            await r.xadd(
+                DEAD_STREAM,
+                {"to": fields["to"], "attempts": str(attempt), "error": str(error)[:500], "failed_at": f"{time.time():.3f}"},
+                maxlen=settings.email_outbox_maxlen,
+                approximate=True,
+            )
+            return
+
+        EMAILS.labels("retried").inc()
+        delay = min(settings.email_retry_base_seconds * 2 ** (attempt - 1), settings.email_retry_max_seconds)
+        logger.warning("email to %s failed (attempt %d), retry in %.1fs: %s", fields["to"], attempt, delay, error)
+        payload = json.dumps({**fields, "attempt": str(attempt)}, sort_keys=True)
+        await r.zadd(RETRY_KEY, {payload: time.time() + delay})
+
+
+outbox_worker = EmailOutboxWorker()
@@ -1,13 +1,127 @@
-from aiosmtplib import SMTP
+"""Отправка писем через пул долгоживущих SMTP-сессий.
+
+Соединение с STARTTLS и логином дорогое (TCP + TLS handshake + AUTH), поэтому
+сессии не закрываются после письма, а возвращаются в пул:
+- не больше `SMTP_POOL_SIZE` сессий; пачка писем из очереди идёт параллельно
+  по уже открытым сессиям;
+- сессия, простоявшая дольше `SMTP_KEEPALIVE_SECONDS`, перед отправкой
+  проверяется NOOP; не ответила — переподключаемся;
+- после `SMTP_MAX_MESSAGES_PER_CONNECTION` писем сессия закрывается (QUIT) —
+  многие серверы ограничивают число писем на соединение;
+- если сервер оборвал соединение посреди отправки, письмо один раз
+  повторяется на новой сессии.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from email.message import EmailMessage
 
+from aiosmtplib import SMTP, SMTPServerDisconnected
+from prometheus_client import Counter
+
 from app.core.config import settings
+from app.core.metrics import registry
+
+SMTP_CONNECTIONS = Counter("smtp_connections_total", "SMTP sessions by event.", ("event",), registry=registry)
 
 
 class EmailSendError(Exception):
     pass
 
 
+@dataclass
+class _Session:
+    smtp: SMTP
+    sent: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class SmtpPool:
+    def __init__(self, size: int):
+        self._slots = asyncio.Semaphore(size)
+        # LIFO: чаще используем недавно работавшие сессии, старые — дольше простаивают и закрываются
+        self._idle: list[_Session] = []
+
+    async def _connect(self) -> _Session:
+        smtp = SMTP(
+            hostname=settings.smtp_host,
+            port=settings.smtp_port,
+            start_tls=settings.smtp_tls,
+            timeout=settings.smtp_timeout,
+        )
+        await smtp.connect()
+        if settings.smtp_user and settings.smtp_password:
+            await smtp.login(settings.smtp_user, settings.smtp_password)
+        SMTP_CONNECTIONS.labels("opened").inc()
+        return _Session(smtp)
+
+    async def _close(self, session: _Session) -> None:
+        SMTP_CONNECTIONS.labels("closed").inc()
+        try:
+            await session.smtp.quit()
+        except Exception:
+            session.smtp.close()
+
+    async def _alive(self, session: _Session) -> bool:
+        if not session.smtp.is_connected:
+            return False
+        if time.monotonic() - session.last_used < settings.smtp_keepalive_seconds:
+            return True
+        try:
+            await session.smtp.noop()
+            return True
+        except Exception:
+            session.smtp.close()
+            return False
+
+    async def _checkout(self) -> _Session:
+        while self._idle:
+            session = self._idle.pop()
+            if await self._alive(session):
+                SMTP_CONNECTIONS.labels("reused").inc()
+                return session
+            SMTP_CONNECTIONS.labels("dropped").inc()
+        return await self._connect()
+
+    async def _checkin(self, session: _Session) -> None:
+        session.sent += 1
+        session.last_used = time.monotonic()
+        if session.sent >= settings.smtp_max_messages_per_connection:
+            await self._close(session)
+        else:
+            self._idle.append(session)
+
+    @asynccontextmanager
+    async def session(self):
+        async with self._slots:
+            session = await self._checkout()
+            try:
+                yield session.smtp
+            except BaseException:
+                # состояние сессии после ошибки неизвестно — не возвращаем её в пул
+                session.smtp.close()
+                raise
+            await self._checkin(session)
+
+    async def send(self, message: EmailMessage) -> None:
+        try:
+            async with self.session() as smtp:
+                await smtp.send_message(message)
+        except SMTPServerDisconnected:
+            # сервер закрыл простаивавшую сессию между NOOP и отправкой — пробуем на новой
+            SMTP_CONNECTIONS.labels("reconnect").inc()
+            async with self.session() as smtp:
+                await smtp.send_message(message)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._close(s) for s in idle), return_exceptions=True)
+
+
+smtp_pool = SmtpPool(settings.smtp_pool_size)
+
+
 async def send_otp_email(to_email: str, code: str) -> bool:
     """
     Возвращает True, если письмо реально отправлено.
@@ -29,14 +143,7 @@ async def send_otp_email(to_email: str, code: str) -> bool:
     )
 
     try:
-        smtp = SMTP(hostname=settings.smtp_host, port=settings.smtp_port, start_tls=settings.smtp_tls)
-        await smtp.connect()
-
-        if settings.smtp_user and settings.smtp_password:
-            await smtp.login(settings.smtp_user, settings.smtp_password)
-
-        await smtp.send_message(msg)
-        await smtp.quit()
+        await smtp_pool.send(msg)
         return True
 
     except Exception as e:
@@ -0,0 +1,102 @@
+"""HTTP-метрики в формате Prometheus (`GET /metrics`).
+
+ASGI-middleware считает по каждому запросу:
+- `http_requests_total` и `http_request_duration_seconds` — по методу, шаблону
+  маршрута и статусу;
+- `http_requests_in_progress` — запросы в обработке (по методу: шаблон маршрута
+  известен только после роутинга);
+- `http_response_size_bytes` — размер тела ответа.
+
+Метка `route` — шаблон (`/api/v1/products/{product_id}`), а не фактический путь,
+поэтому число рядов ограничено числом маршрутов. Всё, что не сматчилось, попадает
+в `route="<unmatched>"`.
+"""
+import time
+
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import SIZE_BUCKETS, registry
+
+METRICS_PATH = "/metrics"
+UNMATCHED = "<unmatched>"
+
+REQUESTS = Counter("http_requests_total", "HTTP requests.", ("method", "route", "status"), registry=registry)
+DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status"), registry=registry
+)
+IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being processed.", ("method",), registry=registry)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size.",
+    ("method", "route", "status"),
+    buckets=SIZE_BUCKETS,
+    registry=registry,
+)
+
+
+def route_template(app, scope: Scope, root_path: str) -> str:
+    # префикс Mount'ов, через которые прошёл запрос (у маршрутов самого приложения пустой)
+    mount = scope.get("root_path", "")[len(root_path):]
+
+    route = scope.get("route")
+    if route is not None:
+        # FastAPI подключает роутеры лениво: в scope лежит исходный маршрут с путём
+        # относительно своего роутера, а префикс include_router хранит сам роутер
+        included = scope.get("fastapi", {}).get("included_router")
+        context = getattr(included, "include_context", None)
+        return mount + getattr(context, "prefix", "") + route.path_format
+
+    if mount:
+        # StaticFiles и прочие Mount — один ряд на точку монтирования
+        return mount + "/{path}"
+
+    # служебные маршруты Starlette (/docs, /openapi.json) не кладут себя в scope
+    for candidate in getattr(app, "routes", ()):
+        if type(candidate) is Route and candidate.path == scope["path"]:
+            return candidate.path
+    return UNMATCHED
+
+
+class PrometheusMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == METRICS_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        root_path = scope.get("root_path", "")
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+
+            route = route_template(scope.get("app"), scope, root_path)
+            labels = (method, route, str(status))
+            REQUESTS.labels(*labels).inc()
+            DURATION.labels(*labels).observe(elapsed)
+            RESPONSE_SIZE.labels(*labels).observe(size)
+
+
+async def metrics_endpoint() -> Response:
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,9 @@
+from prometheus_client import CollectorRegistry, disable_created_metrics
+
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# метрики текущего процесса для /metrics (при нескольких воркерах uvicorn — у каждого свои);
+# свой реестр, а не глобальный REGISTRY prometheus_client — без метрик процесса и GC
+registry = CollectorRegistry(auto_describe=True)
+# ряды *_created (время создания счётчика) не нужны, а число рядов удваивают
+disable_created_metrics()
@@ -1,4 +1,8 @@
 import secrets
+
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
 from app.core.redis_client import get_redis
 from app.core.config import settings
 
@@ -31,6 +35,56 @@ def generate_code() -> str:
     return f"{secrets.randbelow(1_000_000):06d}"
 
 
+# Обе операции — один атомарный Lua-скрипт и один round trip (EVALSHA).
+# Скрипты регистрируются один раз на процесс; если Redis их ещё не знает
+# (перезапуск, другая нода), redis-py сам повторит через EVAL.
+
+# KEYS: otp, cooldown, attempts; ARGV: code, otp_ttl, cooldown_ttl
+# -> 1 — код выдан, 0 — действует cooldown
+ISSUE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('SET', KEYS[2], '1', 'EX', ARGV[3])
+redis.call('SET', KEYS[3], '0', 'EX', ARGV[2])
+return 1
+"""
+
+# KEYS: otp, attempts; ARGV: code, otp_ttl, max_attempts
+VERIFY_SCRIPT = """
+local otp = redis.call('GET', KEYS[1])
+if not otp then
+    return -1
+end
+local attempts = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+if attempts > tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return -2
+end
+if otp ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+return 1
+"""
+
+VERIFY_OK = 1
+VERIFY_INVALID = 0
+VERIFY_NOT_FOUND = -1
+VERIFY_TOO_MANY_ATTEMPTS = -2
+
+_scripts: dict[str, AsyncScript] = {}
+
+
+def _script(r: Redis, source: str) -> AsyncScript:
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = r.register_script(source)
+    return script
+
+
 async def issue_otp(email: str) -> str:
     """
     - ограничение частоты отправки (cooldown)
@@ -38,20 +92,15 @@ async def issue_otp(email: str) -> str:
     - сбрасываем счетчик попыток confirm
     """
     r = get_redis()
-
-    # cooldown: если ключ есть — недавно уже отправляли
-    cooldown_key = _key_cooldown(email)
-    if await r.exists(cooldown_key):
-        raise OtpRateLimitError("Too many requests")
-
     code = generate_code()
-    await r.set(_key_otp(email), code, ex=settings.otp_ttl_seconds)
 
-    # cooldown ключ на N секунд
-    await r.set(cooldown_key, "1", ex=settings.otp_send_cooldown_seconds)
-
-    # попытки подтверждения (TTL такой же, как у OTP)
-    await r.set(_key_attempts(email), "0", ex=settings.otp_ttl_seconds)
+    issued = await _script(r, ISSUE_SCRIPT)(
+        keys=[_key_otp(email), _key_cooldown(email), _key_attempts(email)],
+        args=[code, settings.otp_ttl_seconds, settings.otp_send_cooldown_seconds],
+        client=r,
+    )
+    if not issued:
+        raise OtpRateLimitError("Too many requests")
 
     return code
 
@@ -59,29 +108,19 @@ async def issue_otp(email: str) -> str:
 async def verify_otp(email: str, code: str) -> None:
     """
     - проверяем OTP
-    - учитываем попытки
+    - учитываем попытки (после превышения лимита OTP удаляется)
     - при успехе удаляем OTP и attempts
     """
     r = get_redis()
-    otp = await r.get(_key_otp(email))
-    if not otp:
-        raise OtpNotFoundError("OTP expired or not found")
-
-    # попытки
-    attempts_key = _key_attempts(email)
-    attempts = await r.incr(attempts_key)  # увеличиваем на каждую попытку
-    # выставим TTL на всякий случай, если ключа не было
-    await r.expire(attempts_key, settings.otp_ttl_seconds)
+    result = await _script(r, VERIFY_SCRIPT)(
+        keys=[_key_otp(email), _key_attempts(email)],
+        args=[code, settings.otp_ttl_seconds, settings.otp_confirm_max_attempts],
+        client=r,
+    )
 
-    if attempts > settings.otp_confirm_max_attempts:
-        # блокируем: удаляем OTP, чтобы нельзя было дальше подбирать
-        await r.delete(_key_otp(email))
-        await r.delete(attempts_key)
+    if result == VERIFY_NOT_FOUND:
+        raise OtpNotFoundError("OTP expired or not found")
+    if result == VERIFY_TOO_MANY_ATTEMPTS:
         raise OtpRateLimitError("Too many attempts")
-
-    if otp.decode("utf-8") != code:
+    if result == VERIFY_INVALID:
         raise OtpInvalidError("Invalid code")
-
-    # успех — очищаем
-    await r.delete(_key_otp(email))
-    await r.delete(attempts_key)
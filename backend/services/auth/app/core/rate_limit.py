@@ -0,0 +1,239 @@
+"""Ограничение частоты запросов: скользящее окно в Redis + локальный token bucket.
+
+Правило — `scope:limit/window`, например `ip:20/60` — не больше 20 запросов
+с одного IP за последние 60 секунд. Области (scope):
+- `ip` — адрес клиента (`X-Forwarded-For` учитывается только при RATE_LIMIT_TRUSTED_PROXY_HOPS > 0);
+- `subnet` — сеть /24 для IPv4 и /64 для IPv6;
+- `email` — поле `email` из JSON-тела запроса.
+
+Все правила маршрута проверяются одним Lua-скриптом (один round trip): по
+каждому ключу — sorted set с отметками времени принятых запросов. Запрос
+учитывается, только если проходят все правила; иначе 429 и `Retry-After`
+до освобождения места в самом заполненном окне.
+
+Перед Redis каждый воркер проверяет свой token bucket той же ёмкости: он
+срабатывает, только когда этот воркер сам уже превысил лимит, — такой поток
+отбрасывается локально и в Redis не попадает.
+"""
+import ipaddress
+import logging
+import math
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+from prometheus_client import Counter
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("ip", "subnet", "email")
+IPV4_SUBNET_PREFIX = 24
+IPV6_SUBNET_PREFIX = 64
+
+REJECTED = Counter(
+    "rate_limit_rejected_total", "Requests rejected by rate limiter.", ("limiter", "scope", "source"), registry=registry
+)
+
+# KEYS: счётчики правил; ARGV: member, затем limit и window_ms для каждого ключа
+# -> {1, 0, 0} — принят; {0, retry_after_ms, номер правила} — отклонён
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local retry, rejected = 0, 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        local wait = math.max(tonumber(oldest[2]) + window - now, 1)
+        if wait > retry then
+            retry, rejected = wait, i
+        end
+    end
+end
+if rejected > 0 then
+    return {0, retry, rejected}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, ARGV[i * 2 + 1])
+end
+return {1, 0, 0}
+"""
+
+_script: AsyncScript | None = None
+
+
+@dataclass(frozen=True)
+class Rule:
+    scope: str
+    limit: int
+    window_seconds: float
+
+
+def parse_rules(spec: str) -> tuple[Rule, ...]:
+    """`"ip:20/60,email:5/600"` -> правила; пустая строка — без ограничений."""
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        scope, _, rate = item.partition(":")
+        limit, _, window = rate.partition("/")
+        if scope not in SCOPES or not limit or not window:
+            raise ValueError(f"Invalid rate limit rule: {item!r}")
+        rules.append(Rule(scope, int(limit), float(window)))
+    return tuple(rules)
+
+
+def client_ip(request: Request) -> str | None:
+    """Адрес клиента с учётом RATE_LIMIT_TRUSTED_PROXY_HOPS доверенных прокси.
+
+    Левые элементы `X-Forwarded-For` задаёт сам клиент, поэтому берём тот,
+    что дописал самый внешний из наших прокси: N-й справа.
+    """
+    hops = settings.rate_limit_trusted_proxy_hops
+    if hops > 0:
+        forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.client.host if request.client else None
+
+
+def _subnet(ip: str | None) -> str | None:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    prefix = IPV4_SUBNET_PREFIX if address.version == 4 else IPV6_SUBNET_PREFIX
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+async def _email(request: Request) -> str | None:
+    # тело кэшируется в Request, обработчик прочитает его повторно без затрат
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    email = body.get("email") if isinstance(body, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email else None
+
+
+class _TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: int, now: float):
+        self.tokens = float(capacity)
+        self.updated = now
+
+
+class LocalBuckets:
+    """Token bucket'ы воркера с вытеснением давно не использованных (LRU)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._buckets: OrderedDict[str, _TokenBucket] = OrderedDict()
+
+    def _refill(self, key: str, rule: Rule, now: float) -> _TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _TokenBucket(rule.limit, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            rate = rule.limit / rule.window_seconds
+            bucket.tokens = min(rule.limit, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+        return bucket
+
+    def take(self, keys: list[tuple[str, Rule]]) -> tuple[float, Rule | None]:
+        """Забирает по токену у каждого правила, только если хватает у всех.
+
+        Возвращает (0, None) или (сколько секунд ждать, правило, которое не прошло).
+        """
+        now = time.monotonic()
+        buckets = [(self._refill(key, rule, now), rule) for key, rule in keys]
+
+        wait, blocking = 0.0, None
+        for bucket, rule in buckets:
+            if bucket.tokens < 1:
+                rule_wait = (1 - bucket.tokens) * rule.window_seconds / rule.limit
+                if rule_wait > wait:
+                    wait, blocking = rule_wait, rule
+        if blocking is not None:
+            return wait, blocking
+
+        for bucket, _ in buckets:
+            bucket.tokens -= 1
+        return 0.0, None
+
+
+local_buckets = LocalBuckets(settings.rate_limit_local_max_entries)
+
+
+def _too_many(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests. Try later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimit:
+    """Зависимость FastAPI: `dependencies=[Depends(RateLimit("login", settings.rate_limit_login))]`."""
+
+    def __init__(self, name: str, spec: str):
+        self.name = name
+        self.rules = parse_rules(spec)
+
+    async def _keys(self, request: Request) -> list[tuple[str, Rule]]:
+        ip = client_ip(request)
+        values = {"ip": ip, "subnet": _subnet(ip)}
+        if any(rule.scope == "email" for rule in self.rules):
+            values["email"] = await _email(request)
+
+        return [
+            (f"rl:{self.name}:{rule.scope}:{rule.limit}/{rule.window_seconds:g}:{values[rule.scope]}", rule)
+            for rule in self.rules
+            if values[rule.scope]
+        ]
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.rate_limit_enabled or not self.rules:
+            return
+
+        keys = await self._keys(request)
+        if not keys:
+            return
+
+        wait, blocking = local_buckets.take(keys)
+        if blocking is not None:
+            REJECTED.labels(self.name, blocking.scope, "local").inc()
+            raise _too_many(wait)
+
+        global _script
+        r = get_redis()
+        if _script is None:
+            _script = r.register_script(SLIDING_WINDOW_SCRIPT)
+
+        args: list = [secrets.token_hex(8)]
+        for _, rule in keys:
+            args += [rule.limit, int(rule.window_seconds * 1000)]
+        try:
+            allowed, retry_ms, rejected = await _script(keys=[key for key, _ in keys], args=args, client=r)
+        except RedisError as e:
+            # лимитер не должен сам делать сервис недоступным
+            logger.warning("rate limiter %s: redis error, request allowed: %s", self.name, e)
+            return
+
+        if not allowed:
+            REJECTED.labels(self.name, keys[rejected - 1][1].scope, "redis").inc()
+            raise _too_many(retry_ms / 1000)
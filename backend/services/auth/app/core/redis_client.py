@@ -1,10 +1,101 @@
-from redis.asyncio import Redis
+"""Общий клиент Redis воркера.
+
+Пул — `BlockingConnectionPool`: соединений не больше `REDIS_MAX_CONNECTIONS`,
+при пике запросы ждут свободное (до `REDIS_POOL_TIMEOUT`), а не открывают новые.
+Клиент создаётся и прогревается в lifespan (`init_redis`), закрывается в
+`close_redis`. Сетевые ошибки повторяются с экспоненциальной задержкой.
+Занятость пула и время ожидания соединения видны в /metrics.
+"""
+import asyncio
+import time
+
+from prometheus_client import Histogram
+from prometheus_client.core import GaugeMetricFamily
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+POOL_WAIT = Histogram("redis_pool_wait_seconds", "Time spent waiting for a Redis pool connection.", registry=registry)
+
+
+class InstrumentedBlockingPool(BlockingConnectionPool):
+    """BlockingConnectionPool, который меряет ожидание свободного соединения."""
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(*args, **kwargs)
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        in_use = len(self._in_use_connections)
+        idle = len(self._available_connections)
+        return {"max": self.max_connections, "in_use": in_use, "idle": idle}
+
 
 _redis: Redis | None = None
 
 
+def create_redis() -> Redis:
+    pool = InstrumentedBlockingPool.from_url(
+        settings.redis_url,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+        socket_connect_timeout=settings.redis_connect_timeout,
+        health_check_interval=settings.redis_health_check_interval,
+        retry=Retry(
+            ExponentialBackoff(cap=settings.redis_retry_backoff_cap, base=settings.redis_retry_backoff_base),
+            settings.redis_retries,
+        ),
+        retry_on_error=[ConnectionError, TimeoutError],
+    )
+    return Redis(connection_pool=pool)
+
+
 def get_redis() -> Redis:
     global _redis
     if _redis is None:
-        _redis = Redis(host="redis", port=6379)
+        # вне lifespan (скрипты, тесты) — создаём лениво, без прогрева
+        _redis = create_redis()
     return _redis
+
+
+async def init_redis() -> Redis:
+    """Создаёт клиент, проверяет доступность и открывает соединения заранее."""
+    r = get_redis()
+    await r.ping()
+
+    pool = r.connection_pool
+    count = min(settings.redis_prewarm_connections, pool.max_connections)
+    connections = await asyncio.gather(*(pool.get_connection() for _ in range(count)))
+    for connection in connections:
+        await pool.release(connection)
+    return r
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        await _redis.connection_pool.disconnect()
+        _redis = None
+
+
+class PoolCollector:
+    """Занятость пула снимается в момент чтения /metrics."""
+
+    def collect(self):
+        gauge = GaugeMetricFamily("redis_pool_connections", "Redis pool connections by state.", labels=("state",))
+        if _redis is not None and isinstance(_redis.connection_pool, InstrumentedBlockingPool):
+            for state, value in _redis.connection_pool.snapshot().items():
+                gauge.add_metric((state,), value)
+        yield gauge
+
+
+registry.register(PoolCollector())
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.routes import router as v1_router
@@ -7,10 +9,29 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from app.core.config import settings
+from app.core.email_outbox import outbox_worker
+from app.core.email_sender import smtp_pool
 from app.core.errors import make_error
+from app.core.redis_client import close_redis, init_redis
+from app.core.http_metrics import METRICS_PATH, PrometheusMiddleware, metrics_endpoint
+
 
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # пул Redis создаётся и прогревается до первого запроса и закрывается при остановке
+    await init_redis()
+    if settings.email_outbox_enabled and settings.email_worker_enabled:
+        await outbox_worker.start()
+    try:
+        yield
+    finally:
+        await outbox_worker.stop()
+        await smtp_pool.close()
+        await close_redis()
 
-app = FastAPI(title="Auth Service", version="0.1.0")
+
+app = FastAPI(title="Auth Service", version="0.1.0", lifespan=lifespan)
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
@@ -20,6 +41,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
             code=f"http_{exc.status_code}",
             message=str(exc.detail),
         ),
+        headers=exc.headers,  # например, Retry-After у 429
     )
 
 
@@ -56,7 +78,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# последним, чтобы быть внешним слоем и мерить всю обработку запроса
+app.add_middleware(PrometheusMiddleware)
+
 app.include_router(v1_router, prefix="/api/v1")
+app.add_api_route(METRICS_PATH, metrics_endpoint, methods=["GET"], include_in_schema=False)
 
 def custom_openapi():
     if app.openapi_schema:
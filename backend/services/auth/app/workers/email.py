@@ -0,0 +1,36 @@
+"""Отдельный процесс-отправщик очереди писем.
+
+    python -m app.workers.email
+
+Нужен, если в процессах API отправщик выключен (EMAIL_WORKER_ENABLED=false).
+Таких процессов можно запустить несколько — они делят стрим через consumer group.
+Останавливается по SIGTERM/SIGINT, дописав начатые письма.
+"""
+import asyncio
+import logging
+import signal
+
+from app.core.email_outbox import outbox_worker
+from app.core.email_sender import smtp_pool
+from app.core.redis_client import close_redis, init_redis
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await init_redis()
+    try:
+        await outbox_worker.start()
+        await stop.wait()
+    finally:
+        await outbox_worker.stop()
+        await smtp_pool.close()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+import fakeredis
+import pytest
+
+# пакет `app` сервиса — в корне backend/services/auth
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core import otp_service, redis_client  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def redis():
+    """Чистый fakeredis (с Lua через lupa) вместо пула приложения."""
+    r = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    previous = redis_client._redis
+    redis_client._redis = r
+    otp_service._scripts.clear()
+    yield r
+    redis_client._redis = previous
+    otp_service._scripts.clear()
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app.core import otp_service
+from app.core.config import settings
+from app.core.otp_service import (
+    OtpInvalidError,
+    OtpNotFoundError,
+    OtpRateLimitError,
+    issue_otp,
+    verify_otp,
+)
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = "user@example.com"
+
+
+def _wrong(code: str) -> str:
+    return f"{(int(code) + 1) % 1_000_000:06d}"
+
+
+async def test_issue_stores_code_with_ttl(redis):
+    code = await issue_otp(EMAIL)
+
+    assert len(code) == 6 and code.isdigit()
+    assert await redis.get(f"otp:{EMAIL}") == code.encode()
+    assert 0 < await redis.ttl(f"otp:{EMAIL}") <= settings.otp_ttl_seconds
+    assert 0 < await redis.ttl(f"otp:cooldown:{EMAIL}") <= settings.otp_send_cooldown_seconds
+
+
+async def test_issue_respects_cooldown(redis):
+    code = await issue_otp(EMAIL)
+
+    with pytest.raises(OtpRateLimitError):
+        await issue_otp(EMAIL)
+    # код из первого запроса не перезаписан
+    assert await redis.get(f"otp:{EMAIL}") == code.encode()
+
+    await redis.delete(f"otp:cooldown:{EMAIL}")
+    assert await issue_otp(EMAIL)
+
+
+async def test_verify_accepts_code_once(redis):
+    code = await issue_otp(EMAIL)
+
+    await verify_otp(EMAIL, code)
+
+    assert not await redis.exists(f"otp:{EMAIL}", f"otp:attempts:{EMAIL}")
+    with pytest.raises(OtpNotFoundError):
+        await verify_otp(EMAIL, code)
+
+
+async def test_wrong_code_counts_attempt(redis):
+    code = await issue_otp(EMAIL)
+
+    with pytest.raises(OtpInvalidError):
+        await verify_otp(EMAIL, _wrong(code))
+    assert await redis.get(f"otp:attempts:{EMAIL}") == b"1"
+
+    await verify_otp(EMAIL, code)
+
+
+async def test_max_attempts_burns_code(redis):
+    code = await issue_otp(EMAIL)
+
+    for _ in range(settings.otp_confirm_max_attempts):
+        with pytest.raises(OtpInvalidError):
+            await verify_otp(EMAIL, _wrong(code))
+    # попытка сверх лимита отклоняется даже с верным кодом, и код удаляется
+    with pytest.raises(OtpRateLimitError):
+        await verify_otp(EMAIL, code)
+    with pytest.raises(OtpNotFoundError):
+        await verify_otp(EMAIL, code)
+
+
+async def test_missing_code(redis):
+    with pytest.raises(OtpNotFoundError):
+        await verify_otp(EMAIL, "123456")
+    # попытки без выданного кода не копятся
+    assert not await redis.exists(f"otp:attempts:{EMAIL}")
+
+
+async def test_expired_code(redis):
+    code = await issue_otp(EMAIL)
+    await redis.pexpire(f"otp:{EMAIL}", 1)
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(OtpNotFoundError):
+        await verify_otp(EMAIL, code)
+
+
+async def test_scripts_reload_after_script_flush(redis):
+    code = await issue_otp(EMAIL)
+    await redis.script_flush()
+    issue_sha = otp_service._scripts[otp_service.ISSUE_SCRIPT].sha
+    assert await redis.script_exists(issue_sha) == [False]
+
+    # EVALSHA получает NOSCRIPT, redis-py загружает скрипт заново
+    await verify_otp(EMAIL, code)
+    assert await issue_otp("other@example.com")
+    assert await redis.script_exists(issue_sha) == [True]
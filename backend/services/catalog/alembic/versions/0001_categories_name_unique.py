@@ -0,0 +1,32 @@
+"""categories.name unique index
+
+Revision ID: 0001_categories_name_unique
+Revises:
+Create Date: 2026-10-17
+
+Таблицы создаёт приложение при старте (create_all); миграция догоняет
+существующие БД, где имя категории ещё не было уникальным.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_categories_name_unique"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    duplicates = op.get_bind().execute(
+        sa.text("SELECT name FROM categories GROUP BY name HAVING count(*) > 1 ORDER BY name LIMIT 10")
+    ).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            "Rename or merge duplicate categories before upgrading: " + ", ".join(repr(n) for n in duplicates)
+        )
+
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_categories_name ON categories (name)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_categories_name")
@@ -0,0 +1,32 @@
+"""products full-text and trigram search indexes
+
+Revision ID: 0002_products_search
+Revises: 0001_categories_name_unique
+Create Date: 2026-10-17
+
+Выражение индекса должно буквально совпадать с `_document_sql()` в
+app/core/search.py, иначе планировщик его не возьмёт.
+"""
+from alembic import op
+
+revision = "0002_products_search"
+down_revision = "0001_categories_name_unique"
+branch_labels = None
+depends_on = None
+
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('russian'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(sku, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_products_search_document ON products USING gin (({SEARCH_DOCUMENT}))")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_products_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_products_search_document")
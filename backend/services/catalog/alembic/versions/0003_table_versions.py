@@ -0,0 +1,51 @@
+"""table_versions counters for list ETags
+
+Revision ID: 0003_table_versions
+Revises: 0002_products_search
+Create Date: 2026-10-17
+
+Выражения те же, что применяет app/db/schema.py при старте.
+"""
+from alembic import op
+
+revision = "0003_table_versions"
+down_revision = "0002_products_search"
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ("products", "brands", "categories", "users")
+
+
+def upgrade():
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS table_versions ("
+        "table_name VARCHAR(64) PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0)"
+    )
+    op.execute(
+        "INSERT INTO table_versions (table_name, version) VALUES "
+        + ", ".join(f"('{name}', 0)" for name in VERSIONED_TABLES)
+        + " ON CONFLICT (table_name) DO NOTHING"
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for name in VERSIONED_TABLES:
+        op.execute(
+            f"CREATE OR REPLACE TRIGGER {name}_bump_version "
+            f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {name} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        )
+
+
+def downgrade():
+    for name in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}_bump_version ON {name}")
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version()")
+    op.execute("DROP TABLE IF EXISTS table_versions")
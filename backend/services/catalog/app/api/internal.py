@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+
+from app.core.auth import require_auth, verifier
+from app.core.cache import detail_cache
+from app.db.session import pool_snapshot
+
+router = APIRouter()
+
+SECURITY = [{"BearerAuth": []}]
+
+
+@router.get(
+    "/cache",
+    summary="Статистика кэша карточек",
+    description="Счётчики попаданий/промахов кэша текущего воркера (для подбора размеров и TTL).",
+    openapi_extra={"security": SECURITY},
+)
+async def cache_stats(_: dict = Depends(require_auth)):
+    return detail_cache.snapshot()
+
+
+@router.get(
+    "/auth-cache",
+    summary="Статистика кэша проверенных токенов",
+    description="Попадания/промахи и CPU-время проверки токенов в текущем воркере.",
+    openapi_extra={"security": SECURITY},
+)
+async def auth_cache_stats(_: dict = Depends(require_auth)):
+    return verifier.snapshot()
+
+
+@router.get(
+    "/db-pool",
+    summary="Состояние пула соединений БД",
+    description="Занятые/свободные/overflow соединения и гистограмма ожидания соединения в текущем воркере.",
+    openapi_extra={"security": SECURITY},
+)
+async def db_pool_stats(_: dict = Depends(require_auth)):
+    return pool_snapshot()
@@ -2,22 +2,38 @@ from __future__ import annotations
 
 import re
 from pathlib import Path
-import time
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy import select
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import require_auth
-from app.db.session import get_session
+from app.core.cache import detail_cache, read_through
+from app.core.config import settings
+from app.core.etag import detail_etag, etag_headers, list_etag
+from app.core.fastjson import FastRows
+from app.core.images import build_variants, is_raster
+from app.core.pagination import PageParams, page_params, paginate
+from app.core.uploads import save_upload
+from app.db.crud import delete_returning, update_returning
+from app.db.integrity import translate_integrity_errors
+from app.db.session import SessionLocal, get_read_session, get_session, is_primary
 from app.models.brand import Brand
+from app.schemas.pagination import Page
 from app.schemas.brand import BrandCreate, BrandUpdate, BrandOut
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 SECURITY = [{"BearerAuth": []}]
 
+BRAND_EXISTS = "Brand with same name or slug already exists"
+
+BRAND_ROWS = FastRows(Brand, BrandOut)
 
 _slug_re = re.compile(r"[^a-z0-9]+")
 
@@ -37,13 +53,20 @@ def _slugify(value: str) -> str:
 
 @router.get(
     "/",
-    response_model=list[BrandOut],
+    response_model=Page[BrandOut],
     summary="Список брендов",
     openapi_extra={"security": SECURITY},
 )
-async def list_brands(session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    res = await session.execute(select(Brand).order_by(Brand.id))
-    return res.scalars().all()
+async def list_brands(
+    session: AsyncSession = Depends(get_read_session),
+    _: dict = Depends(require_auth),
+    page: PageParams = Depends(page_params),
+    etag: str | None = Depends(list_etag(Brand)),
+):
+    if settings.fast_json_enabled:
+        result = await paginate(session, BRAND_ROWS.select(), page, order_by=(Brand.id,), scalars=False)
+        return BRAND_ROWS.page_response(result, headers=etag_headers(etag))
+    return await paginate(session, select(Brand), page, order_by=(Brand.id,))
 
 
 @router.post(
@@ -62,15 +85,10 @@ async def create_brand(
     if not slug:
         slug = _slugify(data.name)
 
-    exists = await session.execute(
-        select(Brand).where((Brand.name == data.name) | (Brand.slug == slug))
-    )
-    if exists.scalars().first():
-        raise HTTPException(status_code=400, detail="Brand with same name or slug already exists")
-
     obj = Brand(name=data.name, slug=slug, is_active=data.is_active, description=data.description)
     session.add(obj)
-    await session.commit()
+    async with translate_integrity_errors(session, unique=BRAND_EXISTS):
+        await session.commit()
     await session.refresh(obj)
     return obj
 
@@ -81,11 +99,19 @@ async def create_brand(
     summary="Получить бренд",
     openapi_extra={"security": SECURITY},
 )
-async def get_brand(brand_id: int, session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    obj = await session.get(Brand, brand_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Brand not found")
-    return obj
+async def get_brand(
+    brand_id: int,
+    session: AsyncSession = Depends(get_read_session),
+    _: dict = Depends(require_auth),
+    etag: str | None = Depends(detail_etag(Brand, "brand_id")),
+):
+    async def load() -> BrandOut:
+        obj = await session.get(Brand, brand_id)
+        if not obj:
+            raise HTTPException(status_code=404, detail="Brand not found")
+        return BrandOut.model_validate(obj)
+
+    return await read_through("brand", brand_id, load, etag, fill=is_primary(session))
 
 
 @router.patch(
@@ -100,10 +126,6 @@ async def update_brand(
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(require_auth),
 ):
-    obj = await session.get(Brand, brand_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Brand not found")
-
     payload = data.model_dump(exclude_unset=True)
     if "name" in payload and "slug" not in payload:
         # если обновили name, но slug не передали — генерим новый
@@ -113,34 +135,28 @@ async def update_brand(
         slug = payload["slug"].strip().lower()
         payload["slug"] = slug
 
-    # проверяем уникальность (если изменяется name/slug)
-    name = payload.get("name")
-    slug = payload.get("slug")
-    if name or slug:
-        exists = await session.execute(
-            select(Brand).where(
-                ((Brand.name == name) | (Brand.slug == slug)) & (Brand.id != brand_id)
-            )
-        )
-        if exists.scalars().first():
-            raise HTTPException(status_code=400, detail="Brand with same name or slug already exists")
-
-    for k, v in payload.items():
-        setattr(obj, k, v)
-
-    await session.commit()
-    await session.refresh(obj)
-    return obj
+    # уникальность name/slug проверяет БД
+    row = await update_returning(session, Brand, brand_id, payload, not_found="Brand not found", unique=BRAND_EXISTS)
+    await detail_cache.invalidate("brand", brand_id)
+    return row
 
 
 @router.post(
     "/{brand_id}/image",
     response_model=BrandOut,
     summary="Загрузить изображение бренда",
-    openapi_extra={"security": SECURITY},
+    description=(
+        "Файл пишется на диск потоково, кусками; размер ограничен `UPLOAD_MAX_BYTES`. "
+        "Имя файла — sha256 содержимого: повторная загрузка тех же байтов не создаёт копию.\n\n"
+        "Уменьшенные копии и WebP (`image_variants`) генерируются в фоне после ответа — "
+        "до этого поле пустое.\n\n"
+        "Требуется Bearer access token."
+    ),
+    openapi_extra={"security": SECURITY, "responses": {"413": {"description": "File too large"}}},
 )
 async def upload_brand_image(
     brand_id: int,
+    background: BackgroundTasks,
     file: UploadFile = File(...),
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(require_auth),
@@ -153,26 +169,53 @@ async def upload_brand_image(
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image files are allowed")
 
-    media_root = Path("/app/media/brands")
-    media_root.mkdir(parents=True, exist_ok=True)
+    media_root = Path(settings.media_root) / "brands"
 
     # сохраняем с расширением из имени файла (если есть)
     suffix = Path(file.filename or "").suffix.lower()
     if suffix not in {".png", ".jpg", ".jpeg", ".webp", ".gif", ".svg"}:
         suffix = ".png"
 
-    filename = f"brand_{brand_id}_{int(time.time())}{suffix}"
-    out_path = media_root / filename
-
-    content = await file.read()
-    out_path.write_bytes(content)
+    stored = await save_upload(file, media_root, suffix)
+    image_path = f"/media/brands/{stored.name}"
+    if obj.image_path == image_path and (obj.image_variants or not is_raster(stored.path)):
+        # то же самое изображение — файл и варианты уже есть
+        return obj
 
-    obj.image_path = f"/media/brands/{filename}"
+    obj.image_path = image_path
+    # варианты старого изображения больше не актуальны
+    obj.image_variants = None
     await session.commit()
     await session.refresh(obj)
+    await detail_cache.invalidate("brand", brand_id)
+
+    if is_raster(stored.path):
+        background.add_task(_build_brand_variants, brand_id, stored.path, image_path)
     return obj
 
 
+async def _build_brand_variants(brand_id: int, src: Path, image_path: str) -> None:
+    try:
+        files = await build_variants(src, src.stem)
+    except Exception:
+        logger.exception("failed to build variants for brand %s (%s)", brand_id, src)
+        return
+
+    variants = {
+        name: {fmt: f"/media/brands/{filename}" for fmt, filename in formats.items()}
+        for name, formats in files.items()
+    }
+    async with SessionLocal() as session:
+        # пока шла обработка, могли загрузить новое изображение — тогда эти варианты не нужны
+        await session.execute(
+            update(Brand)
+            .where(Brand.id == brand_id, Brand.image_path == image_path)
+            .values(image_variants=variants)
+        )
+        await session.commit()
+    await detail_cache.invalidate("brand", brand_id)
+
+
 @router.delete(
     "/{brand_id}",
     status_code=204,
@@ -180,10 +223,6 @@ async def upload_brand_image(
     openapi_extra={"security": SECURITY},
 )
 async def delete_brand(brand_id: int, session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    obj = await session.get(Brand, brand_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Brand not found")
-
-    await session.delete(obj)
-    await session.commit()
+    await delete_returning(session, Brand, brand_id, not_found="Brand not found")
+    await detail_cache.invalidate("brand", brand_id)
     return None
@@ -1,27 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
+from app.db.crud import delete_returning, update_returning
+from app.db.integrity import translate_integrity_errors
+from app.db.session import get_read_session, get_session, is_primary
 from app.core.auth import require_auth
+from app.core.cache import detail_cache, read_through
+from app.core.category_tree import build_tree, subtree_ids
+from app.core.config import settings
+from app.core.etag import detail_etag, etag_headers, list_etag
+from app.core.fastjson import FastRows
+from app.core.pagination import PageParams, page_params, paginate
 from app.models.category import Category
-from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryOut
+from app.schemas.pagination import Page
+from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryOut, CategoryTreeOut
 
 router = APIRouter()
 
 SECURITY = [{"BearerAuth": []}]  # имя должно совпадать с securitySchemes в OpenAPI
 
+CATEGORY_ROWS = FastRows(Category, CategoryOut)
+
+CATEGORY_INTEGRITY_ERRORS = {
+    "unique": "Category with same name or slug already exists",
+    "foreign_key": "Parent category does not exist",
+}
+
 
 @router.get(
     "/",
-    response_model=list[CategoryOut],
+    response_model=Page[CategoryOut],
     summary="Список категорий",
     description="Возвращает список категорий каталога. Требуется Bearer access token.",
     openapi_extra={"security": SECURITY},
 )
-async def list_categories(session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    res = await session.execute(select(Category).order_by(Category.id))
-    return res.scalars().all()
+async def list_categories(
+    session: AsyncSession = Depends(get_read_session),
+    _: dict = Depends(require_auth),
+    page: PageParams = Depends(page_params),
+    etag: str | None = Depends(list_etag(Category)),
+):
+    if settings.fast_json_enabled:
+        result = await paginate(session, CATEGORY_ROWS.select(), page, order_by=(Category.id,), scalars=False)
+        return CATEGORY_ROWS.page_response(result, headers=etag_headers(etag))
+    return await paginate(session, select(Category), page, order_by=(Category.id,))
+
+
+@router.get(
+    "/tree",
+    response_model=list[CategoryTreeOut],
+    dependencies=[Depends(list_etag(Category))],
+    summary="Дерево категорий",
+    description=(
+        "Возвращает категории в виде дерева (`children`).\n\n"
+        "Если передан `root_id` — только поддерево этой категории, "
+        "выбранное одним рекурсивным запросом.\n\n"
+        "Требуется Bearer access token."
+    ),
+    openapi_extra={
+        "security": SECURITY,
+        "responses": {
+            404: {"description": "Категория не найдена"},
+            401: {"description": "Нет или неверный Bearer токен"},
+        },
+    },
+)
+async def category_tree(
+    session: AsyncSession = Depends(get_read_session),
+    _: dict = Depends(require_auth),
+    root_id: int | None = Query(default=None, description="Корень поддерева", examples=[1]),
+):
+    stmt = select(Category).order_by(Category.id)
+    if root_id is not None:
+        stmt = stmt.where(Category.id.in_(subtree_ids(root_id)))
+
+    res = await session.execute(stmt)
+    categories = list(res.scalars().all())
+    if root_id is not None and not categories:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    return build_tree(categories, root_id)
 
 
 @router.post(
@@ -33,21 +92,16 @@ async def list_categories(session: AsyncSession = Depends(get_session), _: dict
     openapi_extra={
         "security": SECURITY,
         "responses": {
-            400: {"description": "Категория с таким name или slug уже существует"},
+            400: {"description": "Категория с таким name или slug уже существует или нет родительской категории"},
             401: {"description": "Нет или неверный Bearer токен"},
         },
     },
 )
 async def create_category(data: CategoryCreate, session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    exists = await session.execute(
-        select(Category).where((Category.name == data.name) | (Category.slug == data.slug))
-    )
-    if exists.scalars().first():
-        raise HTTPException(status_code=400, detail="Category with same name or slug already exists")
-
     obj = Category(**data.model_dump())
     session.add(obj)
-    await session.commit()
+    async with translate_integrity_errors(session, **CATEGORY_INTEGRITY_ERRORS):
+        await session.commit()
     await session.refresh(obj)
     return obj
 
@@ -65,11 +119,19 @@ async def create_category(data: CategoryCreate, session: AsyncSession = Depends(
         },
     },
 )
-async def get_category(category_id: int, session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    obj = await session.get(Category, category_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Category not found")
-    return obj
+async def get_category(
+    category_id: int,
+    session: AsyncSession = Depends(get_read_session),
+    _: dict = Depends(require_auth),
+    etag: str | None = Depends(detail_etag(Category, "category_id")),
+):
+    async def load() -> CategoryOut:
+        obj = await session.get(Category, category_id)
+        if not obj:
+            raise HTTPException(status_code=404, detail="Category not found")
+        return CategoryOut.model_validate(obj)
+
+    return await read_through("category", category_id, load, etag, fill=is_primary(session))
 
 
 @router.patch(
@@ -86,17 +148,16 @@ async def get_category(category_id: int, session: AsyncSession = Depends(get_ses
     },
 )
 async def update_category(category_id: int, data: CategoryUpdate, session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    obj = await session.get(Category, category_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Category not found")
-
-    payload = data.model_dump(exclude_unset=True)
-    for k, v in payload.items():
-        setattr(obj, k, v)
-
-    await session.commit()
-    await session.refresh(obj)
-    return obj
+    row = await update_returning(
+        session,
+        Category,
+        category_id,
+        data.model_dump(exclude_unset=True),
+        not_found="Category not found",
+        **CATEGORY_INTEGRITY_ERRORS,
+    )
+    await detail_cache.invalidate("category", category_id)
+    return row
 
 
 @router.delete(
@@ -107,16 +168,26 @@ async def update_category(category_id: int, data: CategoryUpdate, session: Async
     openapi_extra={
         "security": SECURITY,
         "responses": {
+            400: {"description": "Категория используется товарами"},
             404: {"description": "Категория не найдена"},
             401: {"description": "Нет или неверный Bearer токен"},
         },
     },
 )
 async def delete_category(category_id: int, session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    obj = await session.get(Category, category_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Category not found")
-
-    await session.delete(obj)
-    await session.commit()
+    # отвязываем детей сами (а не через ON DELETE SET NULL), чтобы обновился их updated_at
+    # и мы узнали их id для инвалидации кэша; коммит — вместе с удалением
+    children = await session.execute(
+        update(Category).where(Category.parent_id == category_id).values(parent_id=None).returning(Category.id)
+    )
+    child_ids = children.scalars().all()
+
+    await delete_returning(
+        session,
+        Category,
+        category_id,
+        not_found="Category not found",
+        foreign_key="Category is used by products",
+    )
+    await detail_cache.invalidate("category", category_id, *child_ids)
     return None
@@ -1,47 +1,308 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+import csv
+import io
+import json
+from dataclasses import dataclass
+from typing import AsyncIterator, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import Integer, Select, cast, func, literal, null, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
+from app.db.crud import delete_returning, update_returning
+from app.db.integrity import translate_integrity_errors
+from app.db.session import get_read_session, get_session, is_primary, read_sessionmaker
 from app.core.auth import require_auth
+from app.core.cache import detail_cache, read_through
+from app.core.category_tree import subtree_ids
+from app.core.etag import detail_etag, etag_headers, list_etag
+from app.core.config import settings
+from app.core.fastjson import FastRows
+from app.core.pagination import PageParams, page_params, paginate
+from app.core.product_import import import_products
+from app.core.search import search_condition, search_products
 from app.models.product import Product
-from app.models.category import Category
-from app.schemas.product import ProductCreate, ProductUpdate, ProductOut
+from app.schemas.pagination import Page
+from app.schemas.product import ProductCreate, ProductUpdate, ProductOut, ProductImportResult, ProductFacets
 
 router = APIRouter()
 
 SECURITY = [{"BearerAuth": []}]  # имя должно совпадать с securitySchemes в OpenAPI
 
+# ключи сортировки для keyset-пагинации (последним всегда идёт id)
+SORT_KEYS = {
+    "id": (Product.id,),
+    "name": (Product.name, Product.id),
+    "price": (Product.price, Product.id),
+}
+
+PRODUCT_ROWS = FastRows(Product, ProductOut)
+
+PRODUCT_INTEGRITY_ERRORS = {
+    "unique": "SKU already exists",
+    "foreign_key": "Category does not exist",
+}
+
+
+@dataclass(frozen=True)
+class ProductFilters:
+    category_id: int | None
+    include_descendants: bool
+    q: str | None
+
+    @property
+    def is_empty(self) -> bool:
+        return self.category_id is None and self.q is None
+
+    def apply(self, session: AsyncSession, stmt: Select) -> Select:
+        if self.category_id is not None and self.include_descendants:
+            stmt = stmt.where(Product.category_id.in_(subtree_ids(self.category_id)))
+        elif self.category_id is not None:
+            stmt = stmt.where(Product.category_id == self.category_id)
+
+        if self.q is not None:
+            stmt = stmt.where(search_condition(session, self.q))
+        return stmt
+
+
+def product_filters(
+    category_id: int | None = Query(default=None, description="Фильтр по категории", examples=[1]),
+    include_descendants: bool = Query(default=False, description="Учитывать подкатегории `category_id`"),
+    q: str | None = Query(default=None, min_length=2, description="Поисковый запрос", examples=["футболка"]),
+) -> ProductFilters:
+    return ProductFilters(category_id=category_id, include_descendants=include_descendants, q=q)
+
 
 @router.get(
     "/",
-    response_model=list[ProductOut],
+    response_model=Page[ProductOut],
     summary="Список товаров",
     description=(
-        "Возвращает список товаров.\n\n"
+        "Возвращает страницу товаров (keyset-пагинация).\n\n"
         "Фильтры:\n"
         "- `category_id` — ограничить товары одной категорией\n"
-        "- `q` — поиск по имени (подстрока, минимум 2 символа)\n\n"
+        "- `include_descendants` — вместе с `category_id`: включить все подкатегории\n"
+        "- `q` — полнотекстовый поиск по имени, описанию и SKU (минимум 2 символа)\n\n"
+        "Пагинация: `limit` — размер страницы, `sort` — ключ сортировки, "
+        "`cursor` — значение `next_cursor` из предыдущего ответа.\n\n"
         "Требуется Bearer access token."
     ),
     openapi_extra={"security": SECURITY},
 )
 async def list_products(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
+    _: dict = Depends(require_auth),
+    filters: ProductFilters = Depends(product_filters),
+    sort: Literal["id", "name", "price"] = Query(default="id", description="Ключ сортировки"),
+    page: PageParams = Depends(page_params),
+    etag: str | None = Depends(list_etag(Product)),
+):
+    if settings.fast_json_enabled:
+        stmt = filters.apply(session, PRODUCT_ROWS.select())
+        result = await paginate(session, stmt, page, order_by=SORT_KEYS[sort], sort=sort, scalars=False)
+        return PRODUCT_ROWS.page_response(result, headers=etag_headers(etag))
+
+    stmt = filters.apply(session, select(Product))
+    return await paginate(session, stmt, page, order_by=SORT_KEYS[sort], sort=sort)
+
+
+@router.get(
+    "/search",
+    response_model=list[ProductOut],
+    dependencies=[Depends(list_etag(Product))],
+    summary="Поиск товаров",
+    description=(
+        "Полнотекстовый поиск по имени, описанию и SKU с учётом русской морфологии "
+        "и опечаток (триграммы). Результаты отсортированы по релевантности.\n\n"
+        "Требуется Bearer access token."
+    ),
+    openapi_extra={"security": SECURITY},
+)
+async def search(
+    session: AsyncSession = Depends(get_read_session),
     _: dict = Depends(require_auth),
+    q: str = Query(min_length=2, description="Поисковый запрос", examples=["красные футболки"]),
     category_id: int | None = Query(default=None, description="Фильтр по категории", examples=[1]),
-    q: str | None = Query(default=None, min_length=2, description="Поиск по имени", examples=["футбол"]),
+    limit: int = Query(default=20, ge=1, le=100, description="Максимум результатов"),
 ):
-    stmt = select(Product).order_by(Product.id)
+    return await search_products(session, q, category_id=category_id, limit=limit)
+
+
+MAX_PRICE_BUCKETS = 200
+
+# GROUPING(category_id, is_active, bucket): бит 1 — столбец свёрнут в этой строке
+BY_CATEGORY = 0b011
+BY_ACTIVE = 0b101
+BY_PRICE = 0b110
+
+
+def _facets_statement(filtered, postgres: bool):
+    """Счётчики по каждому измерению отдельно, а не по их декартову произведению."""
+    c = filtered.c
+    if postgres:
+        return select(
+            c.category_id,
+            c.is_active,
+            c.bucket,
+            func.grouping(c.category_id, c.is_active, c.bucket),
+            func.count(),
+        ).group_by(func.grouping_sets(c.category_id, c.is_active, c.bucket))
+
+    # SQLite (офлайн-прогоны) не знает GROUPING SETS — то же через UNION ALL
+    return union_all(
+        select(c.category_id, null(), null(), literal(BY_CATEGORY), func.count()).group_by(c.category_id),
+        select(null(), c.is_active, null(), literal(BY_ACTIVE), func.count()).group_by(c.is_active),
+        select(null(), null(), c.bucket, literal(BY_PRICE), func.count()).group_by(c.bucket),
+    )
+
+
+@router.get(
+    "/facets",
+    response_model=ProductFacets,
+    summary="Фасеты товаров",
+    description=(
+        "Счётчики для фильтров витрины по текущему набору фильтров (те же, что у списка): "
+        "по категориям, активным/неактивным и по ценовым корзинам шириной `price_step`.\n\n"
+        "Считается одним проходом: `GROUPING SETS ((category_id), (is_active), (корзина))` "
+        f"в PostgreSQL. Корзин не больше {MAX_PRICE_BUCKETS} — иначе 400, нужен больший `price_step`. "
+        "Ответ без фильтров кэшируется на `FACETS_CACHE_TTL_SECONDS`.\n\n"
+        "Требуется Bearer access token."
+    ),
+    openapi_extra={"security": SECURITY},
+)
+async def product_facets(
+    session: AsyncSession = Depends(get_read_session),
+    _: dict = Depends(require_auth),
+    filters: ProductFilters = Depends(product_filters),
+    price_step: int = Query(default=1000, ge=1, description="Ширина ценовой корзины", examples=[1000]),
+    etag: str | None = Depends(list_etag(Product)),
+):
+    # версия кэша — ETag списка: после любой записи в products запись кэша не подходит
+    version = etag or ""
+    if filters.is_empty:
+        cached = await detail_cache.get("facets", price_step, version)
+        if cached is not None:
+            # Response напрямую минует заголовки, выставленные зависимостью, — повторяем их
+            return Response(content=cached, media_type="application/json", headers=etag_headers(etag))
+
+    postgres = session.bind.dialect.name == "postgresql"
+    if postgres:
+        # CAST(numeric AS integer) в Postgres округляет, поэтому явно floor()
+        bucket = cast(func.floor(Product.price / price_step), Integer).label("bucket")
+    else:
+        # цены > 0, поэтому усечение при CAST совпадает с floor()
+        bucket = cast(Product.price / price_step, Integer).label("bucket")
+    filtered = filters.apply(session, select(Product.category_id, Product.is_active, bucket)).cte("filtered")
+    res = await session.execute(_facets_statement(filtered, postgres))
+
+    total = 0
+    categories: dict[int, int] = {}
+    active = {True: 0, False: 0}
+    buckets: dict[int, int] = {}
+    for category_id, is_active, b, grouping, cnt in res.all():
+        if grouping == BY_CATEGORY:
+            total += cnt
+            categories[category_id] = cnt
+        elif grouping == BY_ACTIVE:
+            active[bool(is_active)] = cnt
+        else:
+            buckets[b] = cnt
+
+    if len(buckets) > MAX_PRICE_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many price buckets ({len(buckets)} > {MAX_PRICE_BUCKETS}), increase price_step",
+        )
+
+    facets = ProductFacets(
+        total=total,
+        categories=[{"category_id": k, "count": v} for k, v in sorted(categories.items())],
+        active={"active": active[True], "inactive": active[False]},
+        price=[
+            {"min_price": b * price_step, "max_price": (b + 1) * price_step, "count": v}
+            for b, v in sorted(buckets.items())
+        ],
+    )
+    if filters.is_empty:
+        body = facets.model_dump_json().encode("utf-8")
+        await detail_cache.set("facets", price_step, body, ttl=settings.facets_cache_ttl_seconds, version=version)
+    return facets
+
+
+EXPORT_COLUMNS = ("id", "category_id", "name", "description", "sku", "price", "is_active")
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _export_row(row) -> dict:
+    data = dict(zip(EXPORT_COLUMNS, row))
+    data["price"] = float(data["price"])
+    return data
 
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(json.dumps(_export_row(r), ensure_ascii=False) + "\n" for r in rows)
+
+
+def _csv_chunk(rows=None) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if rows is None:
+        writer.writerow(EXPORT_COLUMNS)
+    else:
+        writer.writerows(_export_row(r).values() for r in rows)
+    return buf.getvalue()
+
+
+async def _export_stream(sessionmaker, fmt: str, category_id: int | None) -> AsyncIterator[str]:
+    # своя сессия: зависимость get_session может закрыться раньше, чем отдастся весь поток
+    stmt = select(*(getattr(Product, c) for c in EXPORT_COLUMNS)).order_by(Product.id)
     if category_id is not None:
         stmt = stmt.where(Product.category_id == category_id)
 
-    if q is not None:
-        stmt = stmt.where(Product.name.ilike(f"%{q}%"))
+    if fmt == "csv":
+        yield _csv_chunk()
+
+    chunk = _csv_chunk if fmt == "csv" else _ndjson_chunk
+    async with sessionmaker() as session:
+        # серверный курсор: в памяти не больше export_fetch_size строк одновременно
+        result = await session.stream(stmt.execution_options(yield_per=settings.export_fetch_size))
+        async for rows in result.partitions():
+            yield chunk(rows)
+
 
-    res = await session.execute(stmt)
-    return res.scalars().all()
+@router.get(
+    "/export",
+    summary="Экспорт каталога",
+    description=(
+        "Потоково выгружает все товары в формате NDJSON (по объекту на строку) или CSV.\n\n"
+        "Строки читаются серверным курсором пачками, поэтому память не растёт "
+        "с размером каталога.\n\n"
+        "Требуется Bearer access token."
+    ),
+    response_class=StreamingResponse,
+    openapi_extra={
+        "security": SECURITY,
+        "responses": {
+            200: {"content": {"application/x-ndjson": {}, "text/csv": {}}},
+            401: {"description": "Нет или неверный Bearer токен"},
+        },
+    },
+)
+async def export_products(
+    request: Request,
+    _: dict = Depends(require_auth),
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format", description="Формат выгрузки"),
+    category_id: int | None = Query(default=None, description="Фильтр по категории", examples=[1]),
+):
+    return StreamingResponse(
+        _export_stream(read_sessionmaker(request), fmt, category_id),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="products.{fmt}"'},
+    )
 
 
 @router.post(
@@ -63,21 +324,48 @@ async def create_product(
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(require_auth),
 ):
-    cat = await session.get(Category, data.category_id)
-    if not cat:
-        raise HTTPException(status_code=400, detail="Category does not exist")
-
-    exists = await session.execute(select(Product).where(Product.sku == data.sku))
-    if exists.scalars().first():
-        raise HTTPException(status_code=400, detail="SKU already exists")
-
     obj = Product(**data.model_dump())
     session.add(obj)
-    await session.commit()
+    async with translate_integrity_errors(session, **PRODUCT_INTEGRITY_ERRORS):
+        await session.commit()
     await session.refresh(obj)
     return obj
 
 
+@router.post(
+    "/bulk",
+    response_model=ProductImportResult,
+    summary="Массовый импорт товаров",
+    description=(
+        "Принимает поток CSV (с заголовком) или NDJSON в теле запроса и создаёт/обновляет "
+        "товары по SKU пачками (`INSERT ... ON CONFLICT (sku) DO UPDATE`).\n\n"
+        "Невалидные строки и строки с несуществующей категорией пропускаются "
+        "и попадают в `errors` с номером строки.\n\n"
+        "Требуется Bearer access token."
+    ),
+    openapi_extra={
+        "security": SECURITY,
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        },
+        "responses": {
+            401: {"description": "Нет или неверный Bearer токен"},
+        },
+    },
+)
+async def bulk_import_products(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(require_auth),
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format", description="Формат тела запроса"),
+):
+    return await import_products(session, request.stream(), fmt)
+
+
 @router.get(
     "/{product_id}",
     response_model=ProductOut,
@@ -93,13 +381,17 @@ async def create_product(
 )
 async def get_product(
     product_id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     _: dict = Depends(require_auth),
+    etag: str | None = Depends(detail_etag(Product, "product_id")),
 ):
-    obj = await session.get(Product, product_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return obj
+    async def load() -> ProductOut:
+        obj = await session.get(Product, product_id)
+        if not obj:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return ProductOut.model_validate(obj)
+
+    return await read_through("product", product_id, load, etag, fill=is_primary(session))
 
 
 @router.patch(
@@ -122,30 +414,16 @@ async def update_product(
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(require_auth),
 ):
-    obj = await session.get(Product, product_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    payload = data.model_dump(exclude_unset=True)
-
-    if "category_id" in payload:
-        cat = await session.get(Category, payload["category_id"])
-        if not cat:
-            raise HTTPException(status_code=400, detail="Category does not exist")
-
-    if "sku" in payload:
-        exists = await session.execute(
-            select(Product).where(Product.sku == payload["sku"], Product.id != obj.id)
-        )
-        if exists.scalars().first():
-            raise HTTPException(status_code=400, detail="SKU already exists")
-
-    for k, v in payload.items():
-        setattr(obj, k, v)
-
-    await session.commit()
-    await session.refresh(obj)
-    return obj
+    row = await update_returning(
+        session,
+        Product,
+        product_id,
+        data.model_dump(exclude_unset=True),
+        not_found="Product not found",
+        **PRODUCT_INTEGRITY_ERRORS,
+    )
+    await detail_cache.invalidate("product", product_id)
+    return row
 
 
 @router.delete(
@@ -166,10 +444,6 @@ async def delete_product(
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(require_auth),
 ):
-    obj = await session.get(Product, product_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    await session.delete(obj)
-    await session.commit()
+    await delete_returning(session, Product, product_id, not_found="Product not found")
+    await detail_cache.invalidate("product", product_id)
     return None
@@ -5,8 +5,15 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import require_auth
-from app.db.session import get_session
+from app.core.config import settings
+from app.core.etag import detail_etag, etag_headers, list_etag
+from app.core.fastjson import FastRows
+from app.core.pagination import PageParams, page_params, paginate
+from app.db.crud import delete_returning, update_returning
+from app.db.integrity import translate_integrity_errors
+from app.db.session import get_read_session, get_session
 from app.models.user import User
+from app.schemas.pagination import Page
 from app.schemas.user import UserCreate, UserUpdate, UserOut
 
 
@@ -14,16 +21,27 @@ router = APIRouter()
 
 SECURITY = [{"BearerAuth": []}]
 
+USER_EXISTS = "User with same email already exists"
+
+USER_ROWS = FastRows(User, UserOut)
+
 
 @router.get(
     "/",
-    response_model=list[UserOut],
+    response_model=Page[UserOut],
     summary="Список пользователей",
     openapi_extra={"security": SECURITY},
 )
-async def list_users(session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    res = await session.execute(select(User).order_by(User.id))
-    return res.scalars().all()
+async def list_users(
+    session: AsyncSession = Depends(get_read_session),
+    _: dict = Depends(require_auth),
+    page: PageParams = Depends(page_params),
+    etag: str | None = Depends(list_etag(User)),
+):
+    if settings.fast_json_enabled:
+        result = await paginate(session, USER_ROWS.select(), page, order_by=(User.id,), scalars=False)
+        return USER_ROWS.page_response(result, headers=etag_headers(etag))
+    return await paginate(session, select(User), page, order_by=(User.id,))
 
 
 @router.post(
@@ -38,10 +56,6 @@ async def create_user(
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(require_auth),
 ):
-    exists = await session.execute(select(User).where(User.email == str(data.email)))
-    if exists.scalars().first():
-        raise HTTPException(status_code=400, detail="User with same email already exists")
-
     obj = User(
         name=data.name,
         email=str(data.email),
@@ -49,7 +63,8 @@ async def create_user(
         is_active=data.is_active,
     )
     session.add(obj)
-    await session.commit()
+    async with translate_integrity_errors(session, unique=USER_EXISTS):
+        await session.commit()
     await session.refresh(obj)
     return obj
 
@@ -57,10 +72,11 @@ async def create_user(
 @router.get(
     "/{user_id}",
     response_model=UserOut,
+    dependencies=[Depends(detail_etag(User, "user_id"))],
     summary="Получить пользователя",
     openapi_extra={"security": SECURITY},
 )
-async def get_user(user_id: int, session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
+async def get_user(user_id: int, session: AsyncSession = Depends(get_read_session), _: dict = Depends(require_auth)):
     obj = await session.get(User, user_id)
     if not obj:
         raise HTTPException(status_code=404, detail="User not found")
@@ -79,27 +95,12 @@ async def update_user(
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(require_auth),
 ):
-    obj = await session.get(User, user_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="User not found")
-
     payload = data.model_dump(exclude_unset=True)
 
     if "email" in payload and payload["email"] is not None:
-        new_email = str(payload["email"])
-        exists = await session.execute(
-            select(User).where((User.email == new_email) & (User.id != user_id))
-        )
-        if exists.scalars().first():
-            raise HTTPException(status_code=400, detail="User with same email already exists")
-        payload["email"] = new_email
-
-    for k, v in payload.items():
-        setattr(obj, k, v)
-
-    await session.commit()
-    await session.refresh(obj)
-    return obj
+        payload["email"] = str(payload["email"])
+
+    return await update_returning(session, User, user_id, payload, not_found="User not found", unique=USER_EXISTS)
 
 
 @router.delete(
@@ -109,10 +110,5 @@ async def update_user(
     openapi_extra={"security": SECURITY},
 )
 async def delete_user(user_id: int, session: AsyncSession = Depends(get_session), _: dict = Depends(require_auth)):
-    obj = await session.get(User, user_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    await session.delete(obj)
-    await session.commit()
+    await delete_returning(session, User, user_id, not_found="User not found")
     return None
@@ -1,16 +1,68 @@
+import hashlib
+import time
+from collections import OrderedDict
+
 from fastapi import Header, HTTPException
 from jose import jwt, JWTError
 from app.core.config import settings
 
 
-async def require_auth(authorization: str | None = Header(default=None)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing bearer token")
+class TokenVerifier:
+    """Проверка access token с кэшем уже проверенных токенов.
 
-    token = authorization.removeprefix("Bearer ").strip()
+    Админка шлёт один и тот же токен сотни раз за его жизнь (15 минут), поэтому
+    результат проверки подписи и claims кэшируется в LRU по sha256 токена
+    до момента `exp`. Невалидные токены не кэшируются.
+    """
+
+    def __init__(self, secret: str, algorithm: str, max_entries: int):
+        self._secret = secret
+        self._algorithms = [algorithm]
+        self.max_entries = max_entries
+        self._cache: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.cpu_seconds = 0.0
+        self.decode_cpu_seconds = 0.0
+
+    def verify(self, token: str) -> dict:
+        started = time.thread_time()
+        try:
+            return self._verify(token)
+        finally:
+            self.cpu_seconds += time.thread_time() - started
+
+    def _verify(self, token: str) -> dict:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        item = self._cache.get(key)
+        if item is not None:
+            expires_at, claims = item
+            if expires_at > time.time():
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return claims
+            del self._cache[key]
+
+        self.misses += 1
+        started = time.thread_time()
+        try:
+            claims, expires_at = self._decode(token)
+        finally:
+            self.decode_cpu_seconds += time.thread_time() - started
+
+        if expires_at is not None:
+            self._cache[key] = (expires_at, claims)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return claims
+
+    def _decode(self, token: str) -> tuple[dict, float | None]:
+        try:
+            payload = jwt.decode(token, self._secret, algorithms=self._algorithms)
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
 
-    try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
         if payload.get("type") != "access":
             raise HTTPException(status_code=401, detail="Invalid token type")
 
@@ -18,7 +70,27 @@ async def require_auth(authorization: str | None = Header(default=None)):
         if not subject:
             raise HTTPException(status_code=401, detail="Invalid token subject")
 
-        return {"sub": subject}
+        exp = payload.get("exp")
+        return {"sub": subject}, float(exp) if exp is not None else None
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "entries": len(self._cache),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "decode_cpu_seconds": round(self.decode_cpu_seconds, 6),
+        }
+
+
+verifier = TokenVerifier(settings.jwt_secret, settings.jwt_algorithm, settings.auth_cache_max_entries)
+
 
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def require_auth(authorization: str | None = Header(default=None)):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+
+    token = authorization.removeprefix("Bearer ").strip()
+    return verifier.verify(token)
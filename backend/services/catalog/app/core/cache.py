@@ -0,0 +1,185 @@
+"""Read-through кэш сериализованных карточек (товар, бренд, категория).
+
+Два уровня:
+- локальный LRU в памяти процесса — для самых горячих ключей без сетевого хопа;
+- Redis — общий для всех воркеров.
+
+Хранится уже готовый JSON ответа, поэтому на попадании не нужны ни запрос в БД,
+ни валидация Pydantic. Инвалидация — из PATCH/DELETE-обработчиков. Ошибки Redis
+не ломают запрос: кэш просто пропускается.
+
+Вместе с телом хранится версия (ETag строки, из которой оно собрано). Запись
+другой версии считается промахом: иначе тело из кэша, пропустившего инвалидацию
+(локальный LRU другого воркера, массовый импорт), ушло бы под новым ETag, и
+клиент получал бы 304 на устаревшие данные.
+"""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable
+
+from fastapi import Response
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.etag import etag_headers
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# v2: запись — "<версия>\n<тело>"
+KEY_PREFIX = "catalog:v2"
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    invalidations: int = 0
+    redis_errors: int = 0
+
+
+class LocalLRU:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def get(self, key: str) -> bytes | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DetailCache:
+    def __init__(self):
+        self.local = LocalLRU(settings.cache_local_max_entries, settings.cache_local_ttl_seconds)
+        self.stats = CacheStats()
+
+    @staticmethod
+    def key(entity: str, entity_id: int) -> str:
+        return f"{KEY_PREFIX}:{entity}:{entity_id}"
+
+    @staticmethod
+    def _pack(version: str, value: bytes) -> bytes:
+        return version.encode("utf-8") + b"\n" + value
+
+    def _unpack(self, key: str, version: str, entry: bytes) -> bytes | None:
+        stored, _, value = entry.partition(b"\n")
+        if stored.decode("utf-8") != version:
+            self.local.delete(key)
+            return None
+        return value
+
+    async def get(self, entity: str, entity_id: int, version: str = "") -> bytes | None:
+        if not settings.cache_enabled:
+            return None
+
+        key = self.key(entity, entity_id)
+        entry = self.local.get(key)
+        if entry is not None:
+            value = self._unpack(key, version, entry)
+            if value is not None:
+                self.stats.local_hits += 1
+                return value
+
+        try:
+            entry = await get_redis().get(key)
+        except RedisError as e:
+            self.stats.redis_errors += 1
+            logger.warning("cache get failed for %s: %s", key, e)
+            entry = None
+
+        value = self._unpack(key, version, entry) if entry is not None else None
+        if value is None:
+            if entry is not None:
+                self.stats.stale += 1
+            self.stats.misses += 1
+            return None
+
+        self.stats.redis_hits += 1
+        self.local.set(key, entry)
+        return value
+
+    async def set(
+        self, entity: str, entity_id: int, value: bytes, ttl: int | None = None, version: str = ""
+    ) -> None:
+        if not settings.cache_enabled:
+            return
+
+        key = self.key(entity, entity_id)
+        entry = self._pack(version, value)
+        self.local.set(key, entry)
+        try:
+            await get_redis().set(key, entry, ex=ttl or settings.cache_ttl_seconds)
+        except RedisError as e:
+            self.stats.redis_errors += 1
+            logger.warning("cache set failed for %s: %s", key, e)
+
+    async def invalidate(self, entity: str, *entity_ids: int) -> None:
+        if not entity_ids:
+            return
+
+        keys = [self.key(entity, i) for i in entity_ids]
+        for key in keys:
+            self.local.delete(key)
+        self.stats.invalidations += len(keys)
+        try:
+            await get_redis().delete(*keys)
+        except RedisError as e:
+            self.stats.redis_errors += 1
+            logger.warning("cache invalidate failed for %s: %s", keys, e)
+
+    def snapshot(self) -> dict:
+        data = asdict(self.stats)
+        lookups = self.stats.local_hits + self.stats.redis_hits + self.stats.misses
+        data["hit_ratio"] = round((lookups - self.stats.misses) / lookups, 4) if lookups else None
+        data["local_entries"] = len(self.local)
+        return data
+
+
+detail_cache = DetailCache()
+
+
+async def read_through(
+    entity: str,
+    entity_id: int,
+    load: Callable[[], Awaitable[BaseModel]],
+    etag: str | None = None,
+    fill: bool = True,
+) -> Response:
+    """Отдаёт JSON карточки из кэша или через `load()` (который сам кидает 404).
+
+    `etag` — версия строки из `detail_etag`: годится только тело той же версии.
+    `fill=False` — не класть прочитанное в кэш: для чтений с реплики, которая
+    может отставать и вернуть в кэш то, что только что инвалидировали.
+    """
+    version = etag or ""
+    body = await detail_cache.get(entity, entity_id, version)
+    if body is None:
+        body = (await load()).model_dump_json().encode("utf-8")
+        if fill:
+            await detail_cache.set(entity, entity_id, body, version=version)
+    return Response(content=body, media_type="application/json", headers=etag_headers(etag))
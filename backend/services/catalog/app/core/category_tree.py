@@ -0,0 +1,49 @@
+"""Запросы по поддереву категорий через рекурсивный CTE.
+
+Один запрос по индексу `categories.parent_id` независимо от глубины дерева.
+Используется UNION, а не UNION ALL: если через PATCH parent_id кто-то замкнёт
+цикл, рекурсия остановится, когда новых строк не останется.
+"""
+from sqlalchemy import CTE, select
+
+from app.models.category import Category
+
+
+def subtree_cte(root_id: int) -> CTE:
+    """CTE с колонкой `id`: сама категория `root_id` и все её потомки."""
+    tree = (
+        select(Category.id, Category.parent_id)
+        .where(Category.id == root_id)
+        .cte("category_subtree", recursive=True)
+    )
+    children = select(Category.id, Category.parent_id).join(tree, Category.parent_id == tree.c.id)
+    return tree.union(children)
+
+
+def subtree_ids(root_id: int):
+    """Подзапрос id поддерева — для `column.in_(...)`."""
+    return select(subtree_cte(root_id).c.id)
+
+
+def build_tree(categories: list[Category], root_id: int | None = None) -> list[dict]:
+    """Собирает вложенную структуру из плоского списка (порядок детей — как во входе)."""
+    nodes = {
+        c.id: {
+            "id": c.id,
+            "name": c.name,
+            "slug": c.slug,
+            "is_active": c.is_active,
+            "parent_id": c.parent_id,
+            "children": [],
+        }
+        for c in categories
+    }
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_id"])
+        if node["id"] == root_id or parent is None:
+            roots.append(node)
+        else:
+            parent["children"].append(node)
+    return roots
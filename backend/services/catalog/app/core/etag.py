@@ -0,0 +1,104 @@
+"""Условные ответы (ETag / If-None-Match) для list- и detail-эндпоинтов.
+
+- список: ETag из версии таблицы (`table_versions`, её увеличивает триггер на
+  каждую вставку/изменение/удаление) + параметров запроса (фильтры, курсор,
+  limit). Это одна строка по PK, а не проход по всей таблице;
+- карточка: ETag из updated_at одной строки (читается только эта колонка по PK).
+
+При совпадении с If-None-Match зависимость бросает `NotModified`, и обработчик
+в main.py отвечает 304 без тела — строки не загружаются и не сериализуются.
+"""
+import hashlib
+from typing import Any
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import require_auth
+from app.db.session import get_read_session
+from app.models.table_version import TableVersion
+
+# ответы требуют токена — кэшировать можно только в браузере и только с ревалидацией
+CACHE_CONTROL = "private, no-cache"
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # для If-None-Match сравнение слабое: W/"x" совпадает с "x"
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def _apply(request: Request, response: Response, etag: str) -> str:
+    if _matches(request, etag):
+        raise NotModified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return etag
+
+
+def list_etag(model):
+    async def dependency(
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(get_read_session),
+        _: dict = Depends(require_auth),
+    ) -> str | None:
+        res = await session.execute(
+            select(TableVersion.version).where(TableVersion.table_name == model.__tablename__)
+        )
+        version = res.scalar_one_or_none()
+        if version is None:
+            # без счётчика ETag не менялся бы после записи — тогда без условного ответа
+            return None
+        params = sorted(request.query_params.multi_items())
+        etag = make_etag(model.__tablename__, request.url.path, version, params)
+        return _apply(request, response, etag)
+
+    return dependency
+
+
+def detail_etag(model, id_param: str):
+    async def dependency(
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(get_read_session),
+        _: dict = Depends(require_auth),
+    ) -> str | None:
+        try:
+            entity_id = int(request.path_params[id_param])
+        except (KeyError, ValueError):
+            return None
+
+        res = await session.execute(select(model.updated_at).where(model.id == entity_id))
+        last_updated = res.scalar_one_or_none()
+        if last_updated is None:
+            # строки нет — пусть обработчик вернёт 404
+            return None
+
+        etag = make_etag(model.__tablename__, entity_id, last_updated)
+        return _apply(request, response, etag)
+
+    return dependency
+
+
+def etag_headers(etag: str | None) -> dict[str, str]:
+    """Заголовки для обработчиков, которые возвращают Response напрямую."""
+    if etag is None:
+        return {}
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
@@ -0,0 +1,121 @@
+"""Производные изображений: уменьшенные копии и WebP.
+
+Декодирование и кодирование — чистый CPU, поэтому выполняются в отдельном
+пуле процессов (`IMAGE_WORKERS`), а не в event loop и не в пуле потоков под GIL.
+`render_variants` ничего не знает про бренды: получает путь к оригиналу,
+каталог и префикс имени и возвращает имена созданных файлов — так же можно
+обрабатывать и изображения товаров. Префикс — хэш оригинала, поэтому если все
+варианты уже есть на диске (повторная загрузка тех же байтов), они не пересоздаются.
+
+Формат результата: `{"thumb": {"webp": "<file>", "png": "<file>"}, ...}` —
+для каждого размера WebP и запасной вариант в формате оригинала (JPEG или PNG).
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.core.config import settings
+
+# имя варианта -> максимальная сторона, px (меньшие оригиналы не увеличиваются)
+VARIANT_SIZES: dict[str, int] = {
+    "thumb": 128,
+    "small": 256,
+    "medium": 512,
+}
+
+# векторные изображения не растрируем — отдаются как есть
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _save_atomic(image, dest: Path, fmt: str, **params) -> None:
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=".variant-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            image.save(out, fmt, **params)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dest)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def render_variants(
+    src: str,
+    out_dir: str,
+    stem: str,
+    sizes: dict[str, int] = VARIANT_SIZES,
+) -> dict[str, dict[str, str]]:
+    """Выполняется в дочернем процессе: создаёт все варианты и возвращает имена файлов."""
+    from PIL import Image, ImageOps
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(src) as original:
+        # Image.open читает только заголовок — формат известен без декодирования
+        is_jpeg = original.format == "JPEG"
+        fallback_fmt, fallback_ext = ("jpeg", "jpg") if is_jpeg else ("png", "png")
+        variants = {
+            name: {"webp": f"{stem}-{name}.webp", fallback_fmt: f"{stem}-{name}.{fallback_ext}"}
+            for name in sizes
+        }
+        if all((out / f).exists() for formats in variants.values() for f in formats.values()):
+            return variants
+
+        image = ImageOps.exif_transpose(original)
+        if is_jpeg:
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+
+        for name, side in sizes.items():
+            resized = image.copy()
+            resized.thumbnail((side, side), Image.Resampling.LANCZOS)
+
+            files = variants[name]
+            _save_atomic(resized, out / files["webp"], "WEBP", quality=WEBP_QUALITY, method=4)
+            if is_jpeg:
+                _save_atomic(resized, out / files["jpeg"], "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            else:
+                _save_atomic(resized, out / files["png"], "PNG", optimize=True)
+    return variants
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn, а не fork: форк процесса с работающим event loop и потоками небезопасен
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.image_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def is_raster(path: Path) -> bool:
+    return path.suffix.lower() in RASTER_SUFFIXES
+
+
+async def build_variants(
+    src: Path,
+    stem: str,
+    sizes: dict[str, int] = VARIANT_SIZES,
+) -> dict[str, dict[str, str]]:
+    """Варианты кладутся рядом с оригиналом; возвращаются имена файлов."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), render_variants, str(src), str(src.parent), stem, sizes)
@@ -0,0 +1,41 @@
+"""Раздача загруженных файлов (/media).
+
+Загрузки хранятся под именем `<sha256>.<ext>` (см. `app.core.uploads`): путь
+однозначно задаёт содержимое и никогда не переиспользуется для других байтов.
+Поэтому такие файлы (и их варианты `<sha256>-<variant>.<ext>`) отдаются с
+`Cache-Control: immutable` на год и ETag из хэша — браузеры и прокси их не
+ревалидируют. Файлы со старыми именами (`brand_<id>_<ts>.png`) кэшируются как
+обычная статика. Range-запросы и If-None-Match обрабатывает сам FileResponse/StaticFiles.
+"""
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_content_addressed = re.compile(r"^[0-9a-f]{64}(?:-[a-z0-9]+)?\.[a-z0-9]+$")
+
+
+class MediaFiles(StaticFiles):
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        name = os.path.basename(full_path)
+        if _content_addressed.match(name):
+            # ETag из имени: для вариантов оно включает и хэш оригинала, и имя варианта
+            response.headers["etag"] = f'"{name.rsplit(".", 1)[0]}"'
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
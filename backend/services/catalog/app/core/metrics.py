@@ -0,0 +1,48 @@
+import bisect
+import threading
+
+from prometheus_client import CollectorRegistry, disable_created_metrics
+
+# границы корзин в секундах (как у prometheus_client по умолчанию, плюс мелкие)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма с кумулятивными корзинами для JSON-снимков в /internal (семантика Prometheus `le`)."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # последняя — +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        result, total = [], 0
+        for le, n in zip([*map(str, self.buckets), "+Inf"], self._counts):
+            total += n
+            result.append((le, total))
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": dict(self.cumulative()),
+            "count": self.count,
+            "sum": round(self.sum, 6),
+        }
+
+
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# метрики текущего процесса для /metrics (при нескольких воркерах uvicorn — у каждого свои);
+# свой реестр, а не глобальный REGISTRY prometheus_client — без метрик процесса и GC
+registry = CollectorRegistry(auto_describe=True)
+# ряды *_created (время создания счётчика) не нужны, а число рядов удваивают
+disable_created_metrics()
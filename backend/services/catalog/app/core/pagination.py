@@ -0,0 +1,106 @@
+"""Keyset (cursor) пагинация для list-эндпоинтов.
+
+Вместо OFFSET используем seek-предикат по ключу сортировки:
+`WHERE (sort_key, id) > (:last_sort_key, :last_id) ORDER BY sort_key, id LIMIT :n`.
+Такой запрос идёт по индексу и стоит одинаково на любой глубине.
+
+Курсор — непрозрачная base64-строка с именем сортировки и значениями ключа
+последней строки страницы.
+"""
+import base64
+import binascii
+import decimal
+import json
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+@dataclass(frozen=True)
+class PageParams:
+    cursor: str | None
+    limit: int
+
+
+def page_params(
+    cursor: str | None = Query(
+        default=None,
+        description="Курсор из `next_cursor` предыдущей страницы",
+    ),
+    limit: int = Query(
+        default=DEFAULT_LIMIT,
+        ge=1,
+        le=MAX_LIMIT,
+        description="Размер страницы",
+        examples=[DEFAULT_LIMIT],
+    ),
+) -> PageParams:
+    return PageParams(cursor=cursor, limit=limit)
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    # float — строкой: иначе при разборе в Decimal (Numeric) всплывёт двоичная погрешность
+    values = [str(v) if isinstance(v, float) else v for v in values]
+    raw = json.dumps({"s": sort, "v": values}, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, columns: Sequence[InstrumentedAttribute]) -> list[Any]:
+    """Разбирает курсор и приводит значения к python-типам колонок.
+
+    Приведение важно для asyncpg: он строго проверяет типы параметров
+    (например, Numeric ждёт Decimal, а не строку).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = data["v"]
+        if data["s"] != sort or len(values) != len(columns):
+            raise ValueError("cursor does not match sort order")
+        return [col.type.python_type(v) for col, v in zip(columns, values)]
+    except (ValueError, KeyError, TypeError, binascii.Error, decimal.InvalidOperation):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(
+    session: AsyncSession,
+    stmt: Select,
+    params: PageParams,
+    *,
+    order_by: Sequence[InstrumentedAttribute],
+    sort: str = "id",
+    scalars: bool = True,
+) -> dict:
+    """Выполняет `stmt` одной страницей.
+
+    `order_by` — ключ сортировки, последним элементом обязательно идёт
+    уникальная колонка (id), чтобы порядок был строгим.
+    Возвращает dict в формате схемы `Page`. `scalars=False` — для `select()` по
+    колонкам: элементами будут строки `Row` (см. `app.core.fastjson`).
+    """
+    if params.cursor:
+        values = decode_cursor(params.cursor, sort, order_by)
+        if len(order_by) == 1:
+            stmt = stmt.where(order_by[0] > values[0])
+        else:
+            stmt = stmt.where(tuple_(*order_by) > tuple(values))
+
+    # берём на одну строку больше, чтобы понять, есть ли следующая страница
+    stmt = stmt.order_by(*order_by).limit(params.limit + 1)
+    res = await session.execute(stmt)
+    items = list(res.scalars().all() if scalars else res.all())
+
+    next_cursor = None
+    if len(items) > params.limit:
+        items = items[: params.limit]
+        last = items[-1]
+        next_cursor = encode_cursor(sort, [getattr(last, col.key) for col in order_by])
+
+    return {"items": items, "next_cursor": next_cursor}
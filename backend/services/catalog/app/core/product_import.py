@@ -0,0 +1,176 @@
+"""Массовый импорт товаров из CSV/NDJSON-потока.
+
+Тело запроса читается построчно, строки валидируются `ProductCreate`,
+категории сверяются с одним заранее загруженным множеством id, а запись
+идёт пачками через `INSERT ... ON CONFLICT (sku) DO UPDATE`. Id вставленных и
+обновлённых строк возвращает `RETURNING`: после коммита пачки их карточки
+удаляются из кэша.
+"""
+import csv
+import json
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import detail_cache
+from app.core.config import settings
+from app.models.category import Category
+from app.models.product import Product
+from app.schemas.product import ProductCreate, ProductImportError, ProductImportResult
+
+MAX_REPORTED_ERRORS = 1000
+
+INVALID_UTF8 = "Row is not valid UTF-8"
+
+UPSERT_COLUMNS = ("category_id", "name", "description", "sku", "price", "is_active")
+
+
+def _decode(line: bytes) -> str | None:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str | None]:
+    """Строки потока; None — строка не в UTF-8 (ошибка этой строки, а не всего импорта)."""
+    # декодируем только целые строки, чтобы не разрезать многобайтовые символы;
+    # хвост копим списком — `+=` на длинной строке из многих чанков квадратичен
+    pending: list[bytes] = []
+    async for chunk in chunks:
+        *lines, rest = chunk.split(b"\n")
+        if lines:
+            lines[0] = b"".join(pending) + lines[0]
+            pending = []
+            for line in lines:
+                yield _decode(line)
+        if rest:
+            pending.append(rest)
+    tail = b"".join(pending)
+    if tail.strip():
+        yield _decode(tail)
+
+
+async def _iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict | str]:
+    """Отдаёт dict на каждую непустую строку или текст ошибки разбора."""
+    async for line in _iter_lines(chunks):
+        if line is None:
+            yield INVALID_UTF8
+            continue
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            yield f"Invalid JSON: {e}"
+            continue
+        yield obj if isinstance(obj, dict) else "Row must be a JSON object"
+
+
+async def _iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict | str]:
+    header: list[str] | None = None
+    record = ""
+    async for line in _iter_lines(chunks):
+        if line is None:
+            record = ""
+            yield INVALID_UTF8
+            continue
+        # поле в кавычках может содержать перевод строки — копим до чётного числа кавычек
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if not any(v.strip() for v in values):
+            continue
+        if len(values) != len(header):
+            yield f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # пустые ячейки считаем отсутствующими — тогда сработают значения по умолчанию
+        yield {k: v for k, v in zip(header, values) if v != ""}
+
+
+def _upsert_statement(dialect: str):
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    stmt = insert(Product)
+    updates = {c: stmt.excluded[c] for c in UPSERT_COLUMNS if c != "sku"}
+    updates["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=[Product.sku], set_=updates).returning(Product.id)
+
+
+async def import_products(
+    session: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+) -> ProductImportResult:
+    result = ProductImportResult(processed=0, upserted=0, failed=0)
+
+    def fail(row: int, sku: str | None, message: str) -> None:
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(ProductImportError(row=row, sku=sku, message=message))
+
+    category_ids = set((await session.execute(select(Category.id))).scalars().all())
+    stmt = _upsert_statement(session.bind.dialect.name)
+
+    # sku -> (номер строки, значения); повтор SKU в пачке побеждает последним,
+    # иначе Postgres откажет: "ON CONFLICT DO UPDATE command cannot affect row a second time"
+    batch: dict[str, tuple[int, dict]] = {}
+
+    async def flush() -> None:
+        if not batch:
+            return
+        try:
+            res = await session.execute(stmt, [values for _, values in batch.values()])
+            ids = res.scalars().all()
+            await session.commit()
+            result.upserted += len(batch)
+        except DBAPIError as e:
+            # IntegrityError, а также DataError и т.п. — отклоняем пачку, а не весь импорт:
+            # предыдущие пачки уже закоммичены
+            await session.rollback()
+            message = f"Batch rejected by database: {e.orig}"
+            for sku, (row, _) in batch.items():
+                fail(row, sku, message)
+        else:
+            await detail_cache.invalidate("product", *ids)
+        batch.clear()
+
+    rows = _iter_csv(chunks) if fmt == "csv" else _iter_ndjson(chunks)
+    async for item in rows:
+        result.processed += 1
+        row = result.processed
+
+        if isinstance(item, str):
+            fail(row, None, item)
+            continue
+
+        try:
+            data = ProductCreate.model_validate(item)
+        except ValidationError as e:
+            sku = item.get("sku")
+            fail(row, sku if isinstance(sku, str) else None, "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+
+        if data.category_id not in category_ids:
+            fail(row, data.sku, "Category does not exist")
+            continue
+
+        batch.pop(data.sku, None)
+        batch[data.sku] = (row, data.model_dump())
+        if len(batch) >= settings.import_batch_size:
+            await flush()
+
+    await flush()
+    return result
@@ -0,0 +1,28 @@
+from redis.asyncio import Redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from app.core.config import settings
+
+_redis: Redis | None = None
+
+
+def get_redis() -> Redis:
+    global _redis
+    if _redis is None:
+        _redis = Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            socket_connect_timeout=settings.redis_connect_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            # без повторов: по умолчанию redis-py повторяет с задержкой, и промах кэша стоил бы секунды
+            retry=Retry(NoBackoff(), 0),
+        )
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
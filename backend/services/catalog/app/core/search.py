@@ -0,0 +1,128 @@
+"""Полнотекстовый поиск товаров.
+
+PostgreSQL: взвешенный tsvector (конфигурация `russian`, name и sku — вес A,
+description — вес B) под GIN-индексом + триграммный GIN-индекс по name
+(pg_trgm) для опечаток. Ранжирование: ts_rank_cd + word_similarity(q, name).
+
+Расширение и индексы создаются при старте (app.db.schema) и проверяются там
+же: без pg_trgm оператор `%>` падает на каждом запросе поиска.
+
+Другие диалекты (SQLite в офлайн-прогонах): простой LIKE по началу каждого
+слова запроса (до MAX_FALLBACK_TERMS слов) в name/sku/description, всё в одном
+SQL-запросе с LIMIT. Вместо стемминга слово обрезается на пару букв, выше —
+товары, где все слова нашлись в названии.
+"""
+import re
+from typing import Any
+
+from sqlalchemy import ColumnElement, and_, case, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+
+REGCONFIG = "'russian'::regconfig"
+
+MAX_FALLBACK_TERMS = 5
+
+
+def _document_sql(prefix: str = "") -> str:
+    # выражение должно совпадать с индексным буквально — иначе планировщик индекс не возьмёт
+    return (
+        f"setweight(to_tsvector({REGCONFIG}, coalesce({prefix}name, '')), 'A') || "
+        f"setweight(to_tsvector({REGCONFIG}, coalesce({prefix}sku, '')), 'A') || "
+        f"setweight(to_tsvector({REGCONFIG}, coalesce({prefix}description, '')), 'B')"
+    )
+
+
+SEARCH_EXTENSION = "pg_trgm"
+SEARCH_INDEXES = ("ix_products_search_document", "ix_products_name_trgm")
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_products_search_document ON products USING gin (({_document_sql()}))",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+]
+
+
+def _is_postgres(session: AsyncSession) -> bool:
+    return session.bind.dialect.name == "postgresql"
+
+
+def _pg_query(q: str):
+    return func.websearch_to_tsquery(literal_column(REGCONFIG), q)
+
+
+def _pg_match(q: str) -> ColumnElement[bool]:
+    document = literal_column(_document_sql("products."))
+    # `name %> q` — то же, что `q <% name`: запрос похож на какое-то слово имени (GIN-индексируемо)
+    return or_(document.bool_op("@@")(_pg_query(q)), Product.name.bool_op("%>")(q))
+
+
+def _pg_rank(q: str) -> ColumnElement[Any]:
+    document = literal_column(_document_sql("products."))
+    return func.ts_rank_cd(document, _pg_query(q)) + func.word_similarity(q, Product.name)
+
+
+def search_condition(session: AsyncSession, q: str) -> ColumnElement[bool]:
+    """Условие WHERE «товар подходит под запрос `q`» для произвольного select(Product)."""
+    if _is_postgres(session):
+        return _pg_match(q)
+    return _fallback_match(q)
+
+
+async def search_products(
+    session: AsyncSession,
+    q: str,
+    *,
+    category_id: int | None = None,
+    limit: int = 20,
+) -> list[Product]:
+    """Товары по запросу `q`, отсортированные по релевантности."""
+    if _is_postgres(session):
+        stmt = select(Product).where(_pg_match(q)).order_by(_pg_rank(q).desc(), Product.id)
+    else:
+        stmt = select(Product).where(_fallback_match(q)).order_by(_fallback_rank(q), Product.id)
+
+    if category_id is not None:
+        stmt = stmt.where(Product.category_id == category_id)
+    res = await session.execute(stmt.limit(limit))
+    return list(res.scalars().all())
+
+
+# --- fallback для других диалектов ------------------------------------------
+
+_word_re = re.compile(r"[0-9a-zа-яё]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _word_re.findall(text.lower().replace("ё", "е"))
+
+
+def _prefix(word: str) -> str:
+    # грубая замена стемминга: отрезаем окончание, чтобы «футболки» нашли «футболка»
+    return word if len(word) <= 4 else word[: max(4, len(word) - 2)]
+
+
+def _fallback_terms(q: str) -> list[str]:
+    return [_prefix(w) for w in tokenize(q)[:MAX_FALLBACK_TERMS]]
+
+
+def _contains(column, term: str) -> ColumnElement[bool]:
+    # в словах только буквы и цифры — экранировать % и _ не нужно;
+    # SQLite не сравнивает кириллицу без учёта регистра — добавляем вариант с заглавной
+    variants = {term, term.capitalize()}
+    return or_(*(column.ilike(f"%{v}%") for v in sorted(variants)))
+
+
+def _fallback_match(q: str) -> ColumnElement[bool]:
+    terms = _fallback_terms(q)
+    if not terms:
+        return Product.id.is_(None)
+    columns = (Product.name, Product.sku, Product.description)
+    return and_(*(or_(*(_contains(col, t) for col in columns)) for t in terms))
+
+
+def _fallback_rank(q: str) -> ColumnElement[Any]:
+    # сначала товары, у которых все слова нашлись в названии
+    in_name = and_(*(_contains(Product.name, t) for t in _fallback_terms(q)))
+    return case((in_name, 0), else_=1)
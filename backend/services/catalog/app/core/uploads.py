@@ -0,0 +1,157 @@
+"""Потоковое сохранение загруженных файлов в контентно-адресуемое хранилище.
+
+Файл читается из `UploadFile` кусками по `UPLOAD_CHUNK_SIZE` и пишется во
+временный файл в целевом каталоге через пул потоков — event loop не блокируется
+дисковым I/O, а память на запрос не зависит от размера загрузки. Превышение
+`UPLOAD_MAX_BYTES` обрывает запись (413).
+
+По ходу записи считается sha256; итоговое имя — `<sha256><suffix>`. Если такой
+файл уже есть, временный просто удаляется (дедупликация), иначе переименовывается
+через `os.replace` — атомарно, поэтому StaticFiles никогда не отдаёт недописанный
+файл. Одинаковое имя всегда означает одинаковое содержимое, что позволяет
+отдавать /media с `immutable` (см. `app.core.media`).
+
+`save_upload` видит файл только после того, как Starlette разобрал multipart
+целиком во временный файл. Поэтому размер тела режет ещё и `UploadLimitMiddleware`:
+по `Content-Length` — до чтения тела, по числу принятых байтов — во время приёма.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.errors import make_error
+
+# запас на границы multipart и заголовки частей сверх UPLOAD_MAX_BYTES
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    path: Path
+    sha256: str
+    size: int
+    # False — такой файл уже лежал в хранилище
+    created: bool
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+
+def _open_temp(directory: Path) -> tuple[BinaryIO, Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    return os.fdopen(fd, "wb"), Path(name)
+
+
+def _write(out: BinaryIO, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def _finish(out: BinaryIO, tmp_path: Path, dest: Path) -> bool:
+    if dest.exists():
+        _discard(out, tmp_path)
+        return False
+    out.flush()
+    os.fsync(out.fileno())
+    out.close()
+    os.chmod(tmp_path, 0o644)
+    # параллельная загрузка тех же байтов заменит файл идентичным — это безопасно
+    os.replace(tmp_path, dest)
+    return True
+
+
+def _discard(out: BinaryIO, tmp_path: Path) -> None:
+    out.close()
+    tmp_path.unlink(missing_ok=True)
+
+
+async def save_upload(
+    file: UploadFile,
+    directory: Path,
+    suffix: str,
+    *,
+    max_bytes: int | None = None,
+    chunk_size: int | None = None,
+) -> StoredUpload:
+    """Сохраняет загрузку в `directory` под именем `<sha256><suffix>`."""
+    max_bytes = max_bytes or settings.upload_max_bytes
+    chunk_size = chunk_size or settings.upload_chunk_size
+
+    # размер известен заранее (multipart уже разобран) — отказываем без записи
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    out, tmp_path = await run_in_threadpool(_open_temp, directory)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while chunk := await file.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail="File too large")
+            await run_in_threadpool(_write, out, digest, chunk)
+
+        dest = directory / f"{digest.hexdigest()}{suffix}"
+        created = await run_in_threadpool(_finish, out, tmp_path, dest)
+    except BaseException:
+        await run_in_threadpool(_discard, out, tmp_path)
+        raise
+    return StoredUpload(path=dest, sha256=digest.hexdigest(), size=size, created=created)
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail="File too large")
+
+
+class UploadLimitMiddleware:
+    """Ограничивает тело multipart-запросов размером `UPLOAD_MAX_BYTES` (+ запас на разметку).
+
+    Остальные тела (например, поток массового импорта) не трогает.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = settings.upload_max_bytes + MULTIPART_OVERHEAD
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            # отказываем, не читая тело
+            error = _too_large()
+            response = JSONResponse(make_error(error.status_code, error.detail), status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI пробрасывает HTTPException из разбора тела как есть — ответ 413
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,62 @@
+"""Однозапросные PATCH/DELETE.
+
+Вместо `session.get` → изменение объекта → `commit` → `refresh` (3–4 round trip
+и полная ORM-загрузка) выполняется один `UPDATE ... RETURNING` или
+`DELETE ... RETURNING id`, а ответ собирается прямо из возвращённой строки.
+Нет строки — 404.
+"""
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.integrity import translate_integrity_errors
+
+
+async def update_returning(
+    session: AsyncSession,
+    model,
+    entity_id: int,
+    values: dict[str, Any],
+    *,
+    not_found: str,
+    unique: str | None = None,
+    foreign_key: str | None = None,
+) -> dict[str, Any]:
+    """UPDATE по id и все колонки обновлённой строки (updated_at проставит onupdate)."""
+    table = model.__table__
+
+    if not values:
+        # менять нечего — просто отдаём текущее состояние
+        res = await session.execute(select(table).where(table.c.id == entity_id))
+        row = res.mappings().one_or_none()
+    else:
+        stmt = update(table).where(table.c.id == entity_id).values(**values).returning(*table.c)
+        async with translate_integrity_errors(session, unique=unique, foreign_key=foreign_key):
+            res = await session.execute(stmt)
+            row = res.mappings().one_or_none()
+            await session.commit()
+
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return dict(row)
+
+
+async def delete_returning(
+    session: AsyncSession,
+    model,
+    entity_id: int,
+    *,
+    not_found: str,
+    foreign_key: str | None = None,
+) -> None:
+    table = model.__table__
+    stmt = delete(table).where(table.c.id == entity_id).returning(table.c.id)
+    async with translate_integrity_errors(session, foreign_key=foreign_key):
+        res = await session.execute(stmt)
+        deleted = res.scalar_one_or_none()
+        await session.commit()
+
+    if deleted is None:
+        raise HTTPException(status_code=404, detail=not_found)
@@ -0,0 +1,145 @@
+"""Инструментирование SQL в разрезе HTTP-запроса.
+
+Middleware метрик кладёт в contextvar `RequestDbStats` текущего запроса, а
+слушатели `before/after_cursor_execute` на каждом движке:
+- считают выражения и суммарное время в БД;
+- пишут в лог выражения дольше `DB_SLOW_QUERY_MS` (значения параметров
+  заменяются их типами — в логи не попадают email, цены и т.п.);
+- предупреждают, если одна и та же «форма» выражения выполнилась в одном
+  запросе больше `DB_N_PLUS_ONE_THRESHOLD` раз — типичный признак N+1
+  (например, ленивая загрузка `Category.products` / `Product.category` в цикле).
+
+Форма — текст SQL с нормализованными плейсхолдерами: `IN (?, ?, ?)` и
+`IN ($1, $2)` сводятся к одному виду, поэтому разная длина списков не мешает.
+Контекст asyncio-задачи запроса виден и внутри greenlet, в котором SQLAlchemy
+выполняет синхронную часть драйвера.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+import prometheus_client
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# collections.Counter здесь уже занят — метрики через модуль
+SLOW_QUERIES = prometheus_client.Counter(
+    "db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS.", ("route",), registry=registry
+)
+N_PLUS_ONE = prometheus_client.Counter(
+    "db_n_plus_one_total",
+    "Statement shapes repeated above DB_N_PLUS_ONE_THRESHOLD in one request.",
+    ("route",),
+    registry=registry,
+)
+
+
+@dataclass
+class RequestDbStats:
+    # "GET /api/v1/products/5" — для логов; шаблон маршрута middleware проставит после роутинга
+    request: str = "-"
+    route: str = "-"
+    queries: int = 0
+    seconds: float = 0.0
+    slow: int = 0
+    shapes: Counter = field(default_factory=Counter)
+    # формы, о которых уже предупредили (одно предупреждение на форму за запрос)
+    repeated: set[str] = field(default_factory=set)
+
+
+current_db_stats: ContextVar[RequestDbStats | None] = ContextVar("current_db_stats", default=None)
+
+_STARTED = "_query_started_at"
+
+_placeholder_list = re.compile(r"\(\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s|:\w+))*\s*\)")
+_numbered = re.compile(r"\$\d+")
+_spaces = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    shape = _placeholder_list.sub("(?)", statement)
+    shape = _numbered.sub("?", shape)
+    return _spaces.sub(" ", shape).strip()
+
+
+def _redact_one(params: Any) -> Any:
+    if isinstance(params, dict):
+        return {k: type(v).__name__ for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(v).__name__ for v in params]
+    return type(params).__name__
+
+
+def redact(parameters: Any, executemany: bool) -> Any:
+    if executemany and isinstance(parameters, (list, tuple)):
+        sample = _redact_one(parameters[0]) if parameters else None
+        return f"<{len(parameters)} rows of {sample}>"
+    return _redact_one(parameters)
+
+
+def _record(stats: RequestDbStats | None, statement: str, parameters: Any, executemany: bool, elapsed: float) -> None:
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+    if elapsed * 1000 >= settings.db_slow_query_ms:
+        if stats is not None:
+            stats.slow += 1
+        else:
+            SLOW_QUERIES.labels("-").inc()
+        logger.warning(
+            "slow query %.1f ms [%s]: %s params=%s",
+            elapsed * 1000,
+            stats.request if stats else "-",
+            _spaces.sub(" ", statement).strip(),
+            redact(parameters, executemany),
+        )
+
+    if stats is None or settings.db_n_plus_one_threshold <= 0:
+        return
+    shape = statement_shape(statement)
+    stats.shapes[shape] += 1
+    if stats.shapes[shape] > settings.db_n_plus_one_threshold and shape not in stats.repeated:
+        stats.repeated.add(shape)
+        logger.warning(
+            "possible N+1 [%s]: statement executed more than %d times in one request: %s",
+            stats.request,
+            settings.db_n_plus_one_threshold,
+            shape,
+        )
+
+
+def finish_request(stats: RequestDbStats) -> None:
+    """Вызывается middleware в конце запроса, когда известен шаблон маршрута."""
+    if stats.slow:
+        SLOW_QUERIES.labels(stats.route).inc(stats.slow)
+    if stats.repeated:
+        N_PLUS_ONE.labels(stats.route).inc(len(stats.repeated))
+    if stats.queries:
+        logger.debug("%s: %d queries, %.1f ms in db", stats.request, stats.queries, stats.seconds * 1000)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # время старта — на контексте выполнения, а не в conn.info: after_cursor_execute
+        # не вызывается для упавших выражений, и в соединении пула копился бы мусор
+        if context is not None:
+            setattr(context, _STARTED, time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, _STARTED, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        _record(current_db_stats.get(), statement, parameters, executemany, elapsed)
@@ -0,0 +1,52 @@
+"""Перевод нарушений ограничений БД в ответы 400.
+
+Обработчики записи не проверяют уникальность/существование связанных строк
+отдельным SELECT — это лишний round trip и гонка при параллельных запросах.
+Вместо этого пишут сразу, а `IntegrityError` переводится в HTTPException
+по виду нарушенного ограничения.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def integrity_error_kind(exc: IntegrityError) -> str | None:
+    """'unique' | 'foreign_key' | None — по тексту ошибки драйвера.
+
+    Postgres: `... violates unique constraint "..."` / `... violates foreign key constraint "..."`.
+    SQLite: `UNIQUE constraint failed: ...` / `FOREIGN KEY constraint failed`.
+    """
+    text = str(exc.orig).lower()
+    if "unique" in text or "duplicate key" in text:
+        return "unique"
+    if "foreign key" in text:
+        return "foreign_key"
+    return None
+
+
+def integrity_http_error(
+    exc: IntegrityError,
+    *,
+    unique: str | None = None,
+    foreign_key: str | None = None,
+) -> HTTPException:
+    detail = {"unique": unique, "foreign_key": foreign_key}.get(integrity_error_kind(exc))
+    return HTTPException(status_code=400, detail=detail or "Integrity constraint violated")
+
+
+@asynccontextmanager
+async def translate_integrity_errors(
+    session: AsyncSession,
+    *,
+    unique: str | None = None,
+    foreign_key: str | None = None,
+) -> AsyncIterator[None]:
+    """Откатывает сессию и кидает 400 с нужным текстом, если внутри блока нарушено ограничение."""
+    try:
+        yield
+    except IntegrityError as exc:
+        await session.rollback()
+        raise integrity_http_error(exc, unique=unique, foreign_key=foreign_key) from exc
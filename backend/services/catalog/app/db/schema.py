@@ -0,0 +1,134 @@
+"""Догоняющие изменения схемы при старте.
+
+`create_all` создаёт только отсутствующие таблицы — колонки и индексы, которые
+появились позже, на существующей БД PostgreSQL добавляются здесь (те же
+изменения есть в alembic/versions для тех, кто накатывает миграции).
+
+Здесь же ставятся триггеры `table_versions` (версии таблиц для ETag списков) —
+на PostgreSQL и на SQLite, иначе ETag списков не менялся бы после записи.
+
+Каждое выражение выполняется в своей транзакции: в PostgreSQL ошибка прерывает
+транзакцию целиком, и общий `try/except` молча пропускал бы всё, что идёт
+следом. Ошибки пишутся в лог, и старт прерывается — сервис без уникальности
+имён категорий или без нужных колонок работать не должен.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.search import POSTGRES_DDL as SEARCH_DDL, SEARCH_EXTENSION, SEARCH_INDEXES
+from app.db.base import Base
+from app.models.table_version import VERSIONED_TABLES
+
+logger = logging.getLogger(__name__)
+
+SEED_TABLE_VERSIONS = (
+    "INSERT INTO table_versions (table_name, version) VALUES "
+    + ", ".join(f"('{name}', 0)" for name in VERSIONED_TABLES)
+    + " ON CONFLICT (table_name) DO NOTHING"
+)
+
+# триггер уровня выражения: один UPDATE счётчика на INSERT/UPDATE/DELETE, сколько бы строк он ни задел
+# (строка счётчика заблокирована до коммита — записи в одну таблицу идут по очереди;
+# для каталога, который правят админка и импорт, это приемлемо)
+TABLE_VERSION_DDL = [
+    SEED_TABLE_VERSIONS,
+    """
+    CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+        RETURN NULL;
+    END
+    $$
+    """,
+    *(
+        f"CREATE OR REPLACE TRIGGER {name}_bump_version "
+        f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {name} "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        for name in VERSIONED_TABLES
+    ),
+]
+
+# в SQLite триггеры только построчные
+SQLITE_DDL = [
+    SEED_TABLE_VERSIONS,
+    *(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_bump_version_{op.lower()} AFTER {op} ON {name} BEGIN "
+        f"UPDATE table_versions SET version = version + 1 WHERE table_name = '{name}'; END"
+        for name in VERSIONED_TABLES
+        for op in ("INSERT", "UPDATE", "DELETE")
+    ),
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE brands ADD COLUMN IF NOT EXISTS description TEXT",
+    "ALTER TABLE brands ADD COLUMN IF NOT EXISTS image_path VARCHAR(500)",
+    "ALTER TABLE brands ADD COLUMN IF NOT EXISTS image_variants JSON",
+    # уникальность имени категории обеспечивает БД, а не SELECT в обработчике
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_categories_name ON categories (name)",
+    # GIN-индексы полнотекстового/триграммного поиска товаров
+    *SEARCH_DDL,
+    *TABLE_VERSION_DDL,
+]
+
+DUPLICATE_CATEGORY_NAMES = text(
+    "SELECT name FROM categories GROUP BY name HAVING count(*) > 1 ORDER BY name LIMIT 10"
+)
+SEARCH_EXTENSION_EXISTS = text("SELECT count(*) FROM pg_extension WHERE extname = :name")
+EXISTING_INDEXES = text("SELECT indexname FROM pg_indexes WHERE tablename = 'products'")
+
+
+class SchemaError(RuntimeError):
+    pass
+
+
+async def _check_category_names(engine: AsyncEngine) -> None:
+    # уникальный индекс на таблице с дублями не создастся — сообщаем, какие имена мешают
+    async with engine.connect() as conn:
+        duplicates = (await conn.execute(DUPLICATE_CATEGORY_NAMES)).scalars().all()
+    if duplicates:
+        raise SchemaError(
+            "Duplicate category names prevent the unique index ix_categories_name: "
+            + ", ".join(repr(n) for n in duplicates)
+        )
+
+
+async def _check_search(engine: AsyncEngine) -> None:
+    # без pg_trgm и GIN-индексов поиск либо падает на `%>`, либо сканирует таблицу
+    async with engine.connect() as conn:
+        has_extension = (await conn.execute(SEARCH_EXTENSION_EXISTS, {"name": SEARCH_EXTENSION})).scalar()
+        indexes = set((await conn.execute(EXISTING_INDEXES)).scalars().all())
+
+    missing = [] if has_extension else [f"extension {SEARCH_EXTENSION}"]
+    missing += [f"index {name}" for name in SEARCH_INDEXES if name not in indexes]
+    if missing:
+        raise SchemaError(f"Product search is not available, missing: {', '.join(missing)}")
+
+
+async def ensure_schema(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # на SQLite (офлайн-прогоны) create_all строит всё по моделям, ALTER ... IF NOT EXISTS там нет
+    if engine.dialect.name != "postgresql":
+        async with engine.begin() as conn:
+            for ddl in SQLITE_DDL:
+                await conn.exec_driver_sql(ddl)
+        return
+
+    await _check_category_names(engine)
+
+    failed = []
+    for ddl in POSTGRES_DDL:
+        try:
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql(ddl)
+        except Exception:
+            logger.exception("schema: failed to apply %r", ddl)
+            failed.append(ddl)
+
+    if failed:
+        raise SchemaError(f"Failed to apply {len(failed)} schema statement(s), see log: {failed}")
+
+    await _check_search(engine)
@@ -1,10 +1,167 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import time
+from uuid import uuid4
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import Histogram
+from app.db.instrumentation import instrument_engine
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = Histogram()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """QueuePool, который меряет ожидание свободного соединения."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.wait_seconds.observe(time.perf_counter() - started)
+        self.stats.checkouts += 1
+        return conn
+
 
-engine = create_async_engine(settings.database_url, echo=False)
+def _engine_options(url: str, stats: PoolStats) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        # тестовые/бенчмарк-прогоны: пул по умолчанию
+        return {}
+
+    options = {
+        # свой подкласс на каждый движок — чтобы статистика primary и реплики не смешивалась
+        "poolclass": type("InstrumentedQueuePool", (InstrumentedQueuePool,), {"stats": stats}),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        cache_size = settings.db_statement_cache_size
+        connect_args = {
+            # кэш prepared statement'ов SQLAlchemy-адаптера и собственный кэш asyncpg — независимые
+            "prepared_statement_cache_size": cache_size,
+            "statement_cache_size": cache_size,
+        }
+        if cache_size == 0:
+            # за pgbouncer соседние клиенты делят серверные соединения: нумерованные имена
+            # выражений asyncpg там конфликтуют ("prepared statement already exists")
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        options["connect_args"] = connect_args
+    return options
+
+
+def _create_engine(url: str) -> tuple[AsyncEngine, PoolStats]:
+    stats = PoolStats()
+    engine = create_async_engine(url, echo=False, **_engine_options(url, stats))
+
+    if engine.dialect.name == "sqlite":
+        # SQLite по умолчанию не проверяет внешние ключи, а обработчики на них полагаются
+        @event.listens_for(engine.sync_engine, "connect")
+        def _sqlite_foreign_keys(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+    instrument_engine(engine)
+    return engine, stats
+
+
+engine, pool_stats = _create_engine(settings.database_url)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+if settings.database_replica_url:
+    read_engine, read_pool_stats = _create_engine(settings.database_replica_url)
+    ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+else:
+    read_engine, read_pool_stats = engine, pool_stats
+    ReadSessionLocal = SessionLocal
+
+
+# read-your-writes: после успешной записи клиент получает короткоживущую cookie
+# и, пока она жива, читает с primary, а не с (возможно отстающей) реплики
+PIN_COOKIE = "catalog_primary_pin"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    response = await call_next(request)
+    if (
+        settings.read_your_writes_seconds > 0
+        and read_engine is not engine
+        and request.method not in SAFE_METHODS
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            PIN_COOKIE,
+            "1",
+            max_age=settings.read_your_writes_seconds,
+            httponly=True,
+            samesite="lax",
+            path="/",
+        )
+    return response
+
+
+def is_primary(session: AsyncSession) -> bool:
+    """Читает ли сессия с primary (без реплики — всегда да)."""
+    return session.bind is engine
+
+
+def read_sessionmaker(request: Request) -> async_sessionmaker:
+    if request.cookies.get(PIN_COOKIE):
+        return SessionLocal
+    return ReadSessionLocal
+
+
+def _pool_snapshot(db_engine: AsyncEngine, stats: PoolStats) -> dict:
+    pool = db_engine.sync_engine.pool
+    data = {"pool": pool.__class__.__name__, "status": pool.status()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        data.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=settings.db_max_overflow,
+            timeout=pool.timeout(),
+        )
+    data.update(
+        checkouts=stats.checkouts,
+        timeouts=stats.timeouts,
+        wait_seconds=stats.wait_seconds.snapshot(),
+    )
+    return data
+
+
+def pool_snapshot() -> dict:
+    data = {"primary": _pool_snapshot(engine, pool_stats)}
+    if read_engine is not engine:
+        data["replica"] = _pool_snapshot(read_engine, read_pool_stats)
+    return data
+
 
 async def get_session():
     async with SessionLocal() as session:
         yield session
+
+
+async def get_read_session(request: Request):
+    """Сессия для read-only обработчиков: реплика, если она настроена и клиент не закреплён за primary."""
+    async with read_sessionmaker(request)() as session:
+        yield session
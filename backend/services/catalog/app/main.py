@@ -1,55 +1,63 @@
 from pathlib import Path
 
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.config import settings
 from app.core.errors import make_error
+from app.core.http_metrics import METRICS_PATH, PrometheusMiddleware, metrics_endpoint
+from app.core.etag import NotModified, CACHE_CONTROL
+from app.core.images import shutdown_executor as shutdown_image_workers
+from app.core.media import MediaFiles
+from app.core.redis_client import close_redis
+from app.core.uploads import UploadLimitMiddleware
 from app.api.v1.routes import router as v1_router
+from app.api.internal import router as internal_router
 
 # DB init (для учебного проекта: создаём таблицы при старте)
-from app.db.base import Base
-from app.db.session import engine
+from app.db.schema import ensure_schema
+from app.db.session import engine, read_your_writes_middleware
 import app.models  # noqa: F401  # важно: чтобы Base.metadata увидела модели
 
 
 # ✅ ВАЖНО: создаём директорию ДО app.mount, иначе StaticFiles может упасть при старте
-MEDIA_ROOT = Path("/app/media")
+MEDIA_ROOT = Path(settings.media_root)
 BRANDS_MEDIA_DIR = MEDIA_ROOT / "brands"
 MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
 BRANDS_MEDIA_DIR.mkdir(parents=True, exist_ok=True)
 
 app = FastAPI(title="Clothing Builder — Catalog Service", version="0.1.0")
 
-# Статика для загруженных изображений (бренды и т.д.)
+# Статика для загруженных изображений (бренды и т.д.); файлы с хэшем в имени — immutable
 # ✅ check_dir=False на всякий случай (чтобы не падало даже если окружение странное)
-app.mount("/media", StaticFiles(directory=str(MEDIA_ROOT), check_dir=False), name="media")
+app.mount("/media", MediaFiles(directory=str(MEDIA_ROOT), check_dir=False), name="media")
 
 
 @app.on_event("startup")
 async def _startup_create_tables():
-    # ✅ Создаём таблицы, если их ещё нет
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-        # 🔧 Мини-миграции для учебного проекта:
-        # Добавляем поля description и image_path к таблице brands, если их ещё нет.
-        try:
-            await conn.exec_driver_sql(
-                "ALTER TABLE brands ADD COLUMN IF NOT EXISTS description TEXT"
-            )
-            await conn.exec_driver_sql(
-                "ALTER TABLE brands ADD COLUMN IF NOT EXISTS image_path VARCHAR(500)"
-            )
-        except Exception:
-            # если БД ещё не готова/таблица не создана - create_all сделает своё
-            pass
+    # ✅ Создаём таблицы, если их ещё нет, и догоняем схему существующей БД
+    await ensure_schema(engine)
 
 
+@app.on_event("shutdown")
+async def _shutdown_image_workers():
+    shutdown_image_workers()
+
+
+@app.on_event("shutdown")
+async def _shutdown_redis():
+    await close_redis()
+
+
+# самым внутренним: 413 из receive должен дойти до FastAPI как есть, а middleware
+# на BaseHTTPMiddleware (ниже) заворачивают ошибки receive в ExceptionGroup
+app.add_middleware(UploadLimitMiddleware)
+app.middleware("http")(read_your_writes_middleware)
+
 # CORS (для dev)
 app.add_middleware(
     CORSMiddleware,
@@ -59,18 +67,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# последним, чтобы быть внешним слоем и мерить всю обработку запроса
+app.add_middleware(PrometheusMiddleware)
+
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(_: Request, exc: StarletteHTTPException):
     return JSONResponse(make_error(exc.status_code, exc.detail), status_code=exc.status_code)
 
 
+@app.exception_handler(NotModified)
+async def not_modified_handler(_: Request, exc: NotModified):
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": CACHE_CONTROL})
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(_: Request, exc: RequestValidationError):
     return JSONResponse(make_error(400, "Validation error", errors=exc.errors()), status_code=400)
 
 
 app.include_router(v1_router, prefix="/api/v1")
+app.include_router(internal_router, prefix="/internal", tags=["internal"])
+app.add_api_route(METRICS_PATH, metrics_endpoint, methods=["GET"], include_in_schema=False)
 
 
 def custom_openapi():
@@ -2,5 +2,6 @@ from app.models.category import Category
 from app.models.product import Product
 from app.models.brand import Brand
 from app.models.user import User
+from app.models.table_version import TableVersion
 
-__all__ = ["Category", "Product", "Brand", "User"]
+__all__ = ["Category", "Product", "Brand", "User", "TableVersion"]
@@ -13,7 +13,7 @@ class Category(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
-    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    name: Mapped[str] = mapped_column(String(200), nullable=False, unique=True, index=True)
     slug: Mapped[str] = mapped_column(String(200), nullable=False, unique=True, index=True)
 
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TableVersion(Base):
+    """Счётчик изменений таблицы для ETag списков.
+
+    Увеличивается триггером на каждое изменяющее выражение (см. app/db/schema.py),
+    в той же транзакции, что и сама запись.
+    """
+
+    __tablename__ = "table_versions"
+
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+VERSIONED_TABLES = ("products", "brands", "categories", "users")
@@ -23,6 +23,11 @@ class BrandOut(BaseModel):
     is_active: bool = Field(examples=[True])
     description: str | None = Field(default=None, examples=["Streetwear brand from ..."])
     image_path: str | None = Field(default=None, examples=["/media/brands/brand_1.png"])
+    # появляются после фоновой обработки загруженного изображения
+    image_variants: dict[str, dict[str, str]] | None = Field(
+        default=None,
+        examples=[{"thumb": {"webp": "/media/brands/brand_1-thumb.webp", "png": "/media/brands/brand_1-thumb.png"}}],
+    )
 
     class Config:
         from_attributes = True
@@ -35,3 +35,7 @@ class CategoryOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class CategoryTreeOut(CategoryOut):
+    children: list["CategoryTreeOut"] = Field(default_factory=list)
@@ -0,0 +1,14 @@
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = Field(
+        default=None,
+        examples=["eyJrIjoiaWQiLCJ2IjpbNTBdfQ"],
+        description="Курсор следующей страницы (null — это последняя страница)",
+    )
@@ -1,12 +1,15 @@
 from pydantic import BaseModel, Field
 
+# products.price — Numeric(10, 2)
+MAX_PRICE = 99_999_999.99
+
 
 class ProductCreate(BaseModel):
     category_id: int = Field(examples=[1])
     name: str = Field(min_length=2, max_length=250, examples=["Футболка базовая"])
     description: str | None = Field(default=None, examples=["100% хлопок, прямой крой"])
     sku: str = Field(min_length=2, max_length=64, examples=["TSHIRT-BASIC-BLK-M"])
-    price: float = Field(gt=0, examples=[1990.0])
+    price: float = Field(gt=0, le=MAX_PRICE, examples=[1990.0])
     is_active: bool = Field(default=True, examples=[True])
 
 
@@ -15,7 +18,7 @@ class ProductUpdate(BaseModel):
     name: str | None = Field(default=None, min_length=2, max_length=250, examples=["Футболка oversize"])
     description: str | None = Field(default=None, examples=["Плотный хлопок, свободный крой"])
     sku: str | None = Field(default=None, min_length=2, max_length=64, examples=["TSHIRT-OVR-WHT-L"])
-    price: float | None = Field(default=None, gt=0, examples=[2490.0])
+    price: float | None = Field(default=None, gt=0, le=MAX_PRICE, examples=[2490.0])
     is_active: bool | None = Field(default=None, examples=[True])
 
 
@@ -30,3 +33,42 @@ class ProductOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ProductImportError(BaseModel):
+    row: int = Field(examples=[3], description="Номер строки данных (с 1, без заголовка CSV)")
+    sku: str | None = Field(default=None, examples=["TSHIRT-BASIC-BLK-M"])
+    message: str = Field(examples=["Category does not exist"])
+
+
+class ProductImportResult(BaseModel):
+    processed: int = Field(examples=[10000], description="Сколько строк прочитано")
+    upserted: int = Field(examples=[9998], description="Сколько товаров создано или обновлено")
+    failed: int = Field(examples=[2])
+    errors: list[ProductImportError] = Field(
+        default_factory=list,
+        description="Ошибки по строкам (не больше первых 1000)",
+    )
+
+
+class CategoryFacet(BaseModel):
+    category_id: int = Field(examples=[1])
+    count: int = Field(examples=[120])
+
+
+class ActiveFacet(BaseModel):
+    active: int = Field(examples=[118])
+    inactive: int = Field(examples=[2])
+
+
+class PriceBucket(BaseModel):
+    min_price: float = Field(examples=[1000.0], description="Нижняя граница (включительно)")
+    max_price: float = Field(examples=[2000.0], description="Верхняя граница (не включительно)")
+    count: int = Field(examples=[42])
+
+
+class ProductFacets(BaseModel):
+    total: int = Field(examples=[120])
+    categories: list[CategoryFacet]
+    active: ActiveFacet
+    price: list[PriceBucket]
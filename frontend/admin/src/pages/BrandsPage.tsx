@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useState } from "react";
-import { apiFetch } from "../shared/api/client";
+import { apiFetch, fetchAllPages } from "../shared/api/client";
 
 import { Button } from "../components/ui/button";
 import {
@@ -95,10 +95,7 @@ export default function BrandsPage() {
     setLoading(true);
     setError(null);
     try {
-      const res = await apiFetch("/api/v1/brands", { method: "GET" });
-      if (!res.ok) throw new Error(await res.text());
-      const data = (await res.json()) as Brand[];
-      setBrands(data);
+      setBrands(await fetchAllPages<Brand>("/api/v1/brands"));
     } catch (e: any) {
       setError(e?.message ?? "Не удалось загрузить бренды");
     } finally {
@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useState } from "react";
-import { apiFetch } from "../shared/api/client";
+import { apiFetch, fetchAllPages } from "../shared/api/client";
 
 import { Button } from "../components/ui/button";
 import { Card, CardContent } from "../components/ui/card";
@@ -158,13 +158,11 @@ export default function CategoriesPage() {
 
   async function fetchCategories() {
     setServerError("");
-    const res = await apiFetch("/api/v1/categories/");
-    if (!res.ok) {
-      setServerError(`Не удалось загрузить категории (HTTP ${res.status})`);
-      return;
+    try {
+      setCategories(await fetchAllPages<Category>("/api/v1/categories/"));
+    } catch (e: any) {
+      setServerError(`Не удалось загрузить категории: ${e?.message ?? "ошибка"}`);
     }
-    const data: Category[] = await res.json();
-    setCategories(data);
   }
 
   useEffect(() => {
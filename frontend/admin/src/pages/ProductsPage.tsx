@@ -1,15 +1,15 @@
 import { useEffect, useState } from "react";
-import { apiFetch } from "../shared/api/client";
+import { fetchAllPages } from "../shared/api/client";
 
 export default function ProductsPage() {
   const [products, setProducts] = useState<any[]>([]);
 
   useEffect(() => {
     async function fetchProducts() {
-      const res = await apiFetch("/api/v1/products");
-      if (res.ok) {
-        const data = await res.json();
-        setProducts(data);
+      try {
+        setProducts(await fetchAllPages<any>("/api/v1/products"));
+      } catch {
+        // как и раньше: при ошибке список остаётся пустым
       }
     }
     fetchProducts();
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { apiFetch } from "../shared/api/client";
+import { apiFetch, fetchAllPages } from "../shared/api/client";
 
 import { Button } from "../components/ui/button";
 import { Dialog, DialogContent, DialogFooter, DialogHeader, DialogTitle } from "../components/ui/dialog";
@@ -39,13 +39,7 @@ export default function UsersPage() {
     setLoading(true);
     setError(null);
     try {
-      const res = await apiFetch("/api/v1/users/");
-      if (!res.ok) {
-        const txt = await res.text();
-        throw new Error(txt || `HTTP ${res.status}`);
-      }
-      const data = (await res.json()) as User[];
-      setItems(data);
+      setItems(await fetchAllPages<User>("/api/v1/users/"));
     } catch (e: any) {
       setError(e?.message ?? "Не удалось загрузить пользователей");
     } finally {
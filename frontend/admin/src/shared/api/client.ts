@@ -93,3 +93,33 @@ export async function apiFetch(path: string, options: RequestInit = {}) {
 
   return res;
 }
+
+// list-эндпоинты каталога отдают keyset-страницы
+export type Page<T> = { items: T[]; next_cursor: string | null };
+
+// максимальный размер страницы на бэкенде (MAX_LIMIT в catalog/app/core/pagination.py)
+const MAX_PAGE_SIZE = 500;
+
+// Загружает все страницы списка, следуя next_cursor, пока он не станет null
+export async function fetchAllPages<T>(path: string): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const params = new URLSearchParams({ limit: String(MAX_PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    const sep = path.includes("?") ? "&" : "?";
+
+    const res = await apiFetch(`${path}${sep}${params}`);
+    if (!res.ok) {
+      const txt = await res.text();
+      throw new Error(txt || `HTTP ${res.status}`);
+    }
+
+    const page = (await res.json()) as Page<T>;
+    items.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
+
+  return items;
+}